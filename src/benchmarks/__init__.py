@@ -0,0 +1,184 @@
+"""
+Benchmarks for the transaction pipeline.
+
+Run from the src directory, e.g. `python -m benchmarks.categories --rows 1000000`.
+"""
+
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import mock_data
+from enrich import categories
+from enrich.mappings import CODE, COUNTERPARTY, CREDITOR_NAME, DESCRIPTION
+
+CACC_TEMPLATES = [
+    ("PURCHASE - DOMESTIC", "card payment at {merchant}gbr of 12.50 gbp on 01-01-2024"),
+    (
+        "EXTERNAL DIRECT DEBIT",
+        "direct debit payment to {merchant} ref 1234, mandate no 56",
+    ),
+    ("BANK TRANSFER CREDIT", "bank giro credit ref {merchant} ltd, salary"),
+    (
+        "FASTER PAYMENT RECEIPT",
+        "faster payments receipt ref rent from {merchant} ref 99",
+    ),
+    ("BANK TRANSFER DEBIT", "transfer to {merchant} reference savings"),
+    ("BANK TRANSFER DEBIT", "credit card payment"),
+    ("RECURRENT TRANSACTION", "recurrent payment at {merchant}gbr of 9.99 gbp"),
+    ("OTT DEBIT", "payment to {merchant} on 01-01-2024"),
+    ("OTT CREDIT", "receipt from {merchant} reference refund"),
+    ("CASHBACK", "cashback"),
+    ("CREDIT INTEREST", "interest paid"),
+    ("STANDING ORDER", "standing order to {merchant}"),
+]
+
+
+def merchants() -> list[str]:
+    """Every provider keyword known to the categorizer plus some noise."""
+    known = [
+        keyword
+        for name in dir(categories)
+        if name.isupper() and isinstance(getattr(categories, name), list)
+        for keyword in getattr(categories, name)
+    ]
+    noise = [f"unknown merchant {i}" for i in range(len(known))]
+    return known + noise
+
+
+def make_transactions(rows: int, distinct: int = 5000, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic transactions DataFrame with the columns used by enrichment.
+
+    Args:
+        rows (int): Number of rows.
+        distinct (int): Number of distinct (description, code, counterparty) keys.
+        seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    names = merchants()
+    keys = []
+    for i in range(distinct):
+        code, template = CACC_TEMPLATES[i % len(CACC_TEMPLATES)]
+        # card style "merchant*location" names, clean_counterparty expects a
+        # "*" after some merchants
+        merchant = f"{names[rng.integers(len(names))]}*{i % 10}"
+        description = template.format(merchant=merchant, amount=f"{i % 100}.{i % 7}0")
+        keys.append((description, code, merchant, "CACC" if i % 3 else "CARD"))
+
+    picks = rng.integers(distinct, size=rows)
+    description, code, counterparty, account_type = (
+        np.array(column, dtype=object)[picks] for column in zip(*keys)
+    )
+    return pd.DataFrame(
+        {
+            DESCRIPTION: description,
+            CODE: code,
+            COUNTERPARTY: counterparty,
+            CREDITOR_NAME: counterparty,
+            "account_type": account_type,
+            "amount": np.round(rng.normal(0, 100, size=rows), 2),
+        }
+    )
+
+
+def make_account_data(
+    transactions_per_account: int, accounts: list[str] | None = None, seed: int = 0
+) -> dict:
+    """
+    Build synthetic account data as saved by account_api.get_latest_data.
+
+    Args:
+        transactions_per_account (int): Number of booked and pending
+            transactions of each account.
+        accounts (list[str]): Account ids, those of mock_data.get_requisition
+            by default.
+        seed (int): Random seed.
+    """
+    accounts = accounts or mock_data.get_requisition().accounts
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i, account_id in enumerate(accounts):
+        df = make_transactions(
+            transactions_per_account,
+            distinct=min(5000, max(transactions_per_account, 1)),
+            seed=seed + i,
+        )
+        days = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+            rng.integers(365, size=len(df)), unit="D"
+        )
+        transactions = [
+            {
+                "transactionId": f"{account_id}-{row}",
+                "bookingDate": day.strftime("%Y-%m-%d"),
+                "valueDate": day.strftime("%Y-%m-%d"),
+                "bookingDateTime": day.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "transactionAmount": {"amount": f"{amount:.2f}", "currency": "GBP"},
+                "creditorName": creditor_name,
+                "remittanceInformationUnstructured": description,
+                "proprietaryBankTransactionCode": code,
+                "internalTransactionId": f"{row:032x}",
+            }
+            for row, (day, amount, creditor_name, description, code) in enumerate(
+                zip(days, df["amount"], df[CREDITOR_NAME], df[DESCRIPTION], df[CODE])
+            )
+        ]
+        pending = len(transactions) // 20
+        if i % 2:
+            account = {
+                "resourceId": f"resource-{i}",
+                "currency": "GBP",
+                "cashAccountType": "CARD",
+                "maskedPan": "**4572",
+                "details": f"credit card {i}",
+            }
+        else:
+            account = {
+                "resourceId": f"resource-{i}",
+                "bban": f"{i:014d}",
+                "currency": "GBP",
+                "name": f"account {i}",
+                "cashAccountType": "CACC",
+            }
+        data[account_id] = {
+            "account": account,
+            "transactions": {
+                "booked": transactions[pending:],
+                "pending": transactions[:pending],
+            },
+            "balances": [
+                {
+                    "balanceAmount": {"amount": f"{amount:.2f}", "currency": "GBP"},
+                    "balanceType": balance_type,
+                    "referenceDate": "2024-12-31",
+                }
+                for balance_type, amount in [
+                    ("interimAvailable", 1000.0 + i),
+                    ("interimBooked", 900.0 + i),
+                ]
+            ],
+            "metadata": {
+                "id": account_id,
+                "created": "2023-03-13T17:58:53.898557Z",
+                "last_accessed": "2023-12-30T14:42:46.907297Z",
+                "iban": f"GB00ABBY{i:014d}",
+                "institution_id": "SANTANDER_GB_ABBYGB2L",
+                "status": "READY",
+                "owner_name": "",
+            },
+        }
+    return data
+
+
+@contextmanager
+def timer(label: str, results: dict | None = None):
+    """Log (and optionally record) the wall time of a block in seconds."""
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    logger.info(f"{label}: {elapsed:.3f}s")
+    if results is not None:
+        results[label] = elapsed
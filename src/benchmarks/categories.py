@@ -0,0 +1,46 @@
+"""
+Row-wise vs vectorized TransactionCategorizer.
+
+The row-wise path is timed on a sample and extrapolated, as running it on 1M
+rows takes several minutes.
+"""
+
+import argparse
+
+from loguru import logger
+
+from benchmarks import make_transactions, timer
+from enrich import categories
+
+
+def main(rows: int = 1_000_000, sample: int = 20_000):
+    df = make_transactions(rows)
+    results = {}
+
+    with timer("row-wise (sample)", results):
+        expected = categories.categorizer.categorize_transactions(
+            df.head(sample), vectorized=False
+        )
+    with timer("vectorized", results):
+        labelled = categories.categorizer.categorize_transactions(df)
+    for run in ["cold", "warm"]:
+        with timer(f"vectorized, memoized ({run} cache)", results):
+            memoized = categories.categorizer.categorize_transactions(df, memoize=True)
+        assert memoized["category"].equals(labelled["category"])
+    logger.info(f"cache: {categories.categorizer.category_cache.stats()}")
+
+    assert (
+        labelled["category"].head(sample).tolist() == expected["category"].tolist()
+    ), "vectorized labels differ from row-wise labels"
+
+    rowwise = results["row-wise (sample)"] * rows / sample
+    logger.info(f"row-wise (extrapolated to {rows} rows): {rowwise:.1f}s")
+    logger.info(f"speedup: {rowwise / results['vectorized']:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000)
+    args = parser.parse_args()
+    main(rows=args.rows, sample=args.sample)
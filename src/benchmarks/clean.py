@@ -0,0 +1,70 @@
+"""
+Row-wise vs columnar clean_transactions.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import model
+from benchmarks import make_transactions, timer
+from enrich import clean
+
+
+def clean_transactions_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """The cleaning of clean_transactions as it was, with apply per field."""
+    df = clean.remove_nan(df)
+    for field in clean.INTEGER_CATEGORY_FIELDS:
+        df = clean.handle_integer_category(df=df, field=field)
+    for field in clean.CURRENCY_FIELDS:
+        df = clean.round_currency(df, field)
+    for field in clean.TEXT_FIELDS:
+        df = clean.clean_text_field(df, field)
+    return df.dropna(axis=1)
+
+
+def make_transactions_to_clean(rows: int) -> pd.DataFrame:
+    df = make_transactions(rows)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "booking_date": "2024-01-01",
+            "remittance_information_unstructured": df[
+                "remittance_information_unstructured"
+            ],
+            "amount": df["amount"],
+            "creditor_name": df["creditor_name"].where(rng.random(rows) > 0.3),
+            "debtor_name": None,
+            "merchant_category_code": pd.Series(
+                rng.choice(["5411", "5812", None], size=rows), dtype=object
+            ),
+            "exchange_rate": np.nan,
+        }
+    )
+
+
+def main(rows: int = 1_000_000):
+    df = make_transactions_to_clean(rows)
+    results = {}
+
+    with timer("row-wise", results):
+        expected = clean_transactions_rowwise(df.copy())
+    with timer("columnar", results):
+        cleaned = clean.clean_transactions_dataframe(df)
+
+    sample = min(rows, 10_000)
+    expected_records = expected.head(sample).to_dict(orient="records")
+    cleaned_records = cleaned.head(sample).to_dict(orient="records")
+    assert [model.Transaction(**d) for d in cleaned_records] == [
+        model.Transaction(**d) for d in expected_records
+    ]
+    logger.info(f"speedup: {results['row-wise'] / results['columnar']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(rows=args.rows)
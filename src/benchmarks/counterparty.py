@@ -0,0 +1,46 @@
+"""
+Row-wise get_counterparty vs vectorized add_counterparties.
+"""
+
+import argparse
+
+import pandas as pd
+from loguru import logger
+
+from benchmarks import make_transactions, timer
+from enrich import counterparty
+
+
+def add_counterparties_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """add_counterparties as it was, one get_counterparty call per row."""
+    for account_type in ["CACC", "CARD"]:
+        is_account_type = df.account_type == account_type
+        df.loc[is_account_type, "counterparty"] = (
+            df.loc[is_account_type]
+            .apply(counterparty.get_counterparty, account_type=account_type, axis=1)
+            .fillna("unknown")
+        )
+    df["counterparty"] = df["counterparty"].apply(counterparty.clean_counterparty)
+    return df
+
+
+def main(rows: int = 200_000):
+    df = make_transactions(rows).drop(columns="counterparty")
+    results = {}
+
+    logger.disable("enrich.counterparty")
+    with timer("row-wise", results):
+        expected = add_counterparties_rowwise(df.copy())
+    with timer("vectorized", results):
+        extracted = counterparty.add_counterparties(df.copy())
+    logger.enable("enrich.counterparty")
+
+    assert extracted["counterparty"].equals(expected["counterparty"])
+    logger.info(f"speedup: {results['row-wise'] / results['vectorized']:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    main(rows=args.rows)
@@ -0,0 +1,115 @@
+"""
+Transaction list vs columnar pipeline, from historic and latest transactions to
+the records saved to transactions.json.
+
+Wall time and peak memory (tracemalloc) are measured in separate runs, as
+tracing allocations slows the list path down far more than the columnar one.
+"""
+
+import argparse
+import json
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import model
+import process_transactions
+from benchmarks import make_transactions, timer
+from enrich.mappings import CODE, CREDITOR_NAME, DESCRIPTION
+
+
+def make_raw_transactions(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Transactions as read from the historic csv, after column renaming."""
+    df = make_transactions(rows, seed=seed)
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(365, size=rows), unit="D"
+    )
+    amount = df["amount"].where(df["amount"] != 0, 1.0)
+    return pd.DataFrame(
+        {
+            "booking_date": days.strftime("%Y-%m-%d"),
+            "value_date": days.strftime("%Y-%m-%d"),
+            "remittance_information_unstructured": df[DESCRIPTION],
+            "proprietary_bank_transaction_code": df[CODE],
+            "amount": amount,
+            "transaction_currency": "GBP",
+            "status": np.where(rng.random(rows) > 0.05, "booked", "pending"),
+            "transaction_id": [f"{seed}-{i}" for i in range(rows)],
+            "account_id": "590300bd-3daf-4d5e-9274-7a3782261f7e",
+            "account_type": df["account_type"],
+            "account_name": "joint account",
+            "creditor_name": df[CREDITOR_NAME].where(rng.random(rows) > 0.3),
+            "debtor_name": None,
+            "merchant_category_code": pd.Series(
+                rng.choice(["5411", "5812", None], size=rows), dtype=object
+            ),
+        }
+    )
+
+
+def run_list(historic_raw: pd.DataFrame, latest: list[model.Transaction]):
+    historic = [
+        model.Transaction.from_dict(d) for d in historic_raw.to_dict(orient="records")
+    ]
+    transactions = process_transactions.combine_transactions(historic, latest)
+    enriched = process_transactions.enrich(transactions)
+    return [transaction.to_dict() for transaction in enriched]
+
+
+def run_columnar(historic_raw: pd.DataFrame, latest: list[model.Transaction]):
+    transactions_df = process_transactions.combine_transactions_dataframe(
+        model.conform_transactions_dataframe(historic_raw),
+        model.transactions_to_dataframe(latest),
+    )
+    enriched_df = process_transactions.enrich_dataframe(transactions_df)
+    return [
+        record
+        for records in model.iter_transaction_records(enriched_df)
+        for record in records
+    ]
+
+
+def peak_memory(func, *args) -> int:
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(rows: int = 200_000):
+    historic_raw = make_raw_transactions(rows, seed=0)
+    latest_raw = make_raw_transactions(rows // 10, seed=1)
+    latest = [
+        model.Transaction.from_dict(d) for d in latest_raw.to_dict(orient="records")
+    ]
+    logger.disable("process_transactions")
+    logger.disable("enrich")
+
+    results = {}
+    with timer("list", results):
+        expected = run_list(historic_raw, latest)
+    with timer("columnar", results):
+        records = run_columnar(historic_raw, latest)
+
+    # same-day transactions may be ordered differently
+    def dumps(records):
+        return sorted(json.dumps(record, default=str) for record in records)
+
+    assert dumps(records) == dumps(expected)
+    logger.info(f"speedup: {results['list'] / results['columnar']:.1f}x")
+
+    for label, func in [("list", run_list), ("columnar", run_columnar)]:
+        peak = peak_memory(func, historic_raw, latest)
+        logger.info(f"{label} peak memory: {peak / 2**20:.0f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    main(rows=args.rows)
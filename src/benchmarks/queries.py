@@ -0,0 +1,82 @@
+"""
+Repeated UserData lookups, linear scans vs the indexes, as a dashboard page
+querying accounts, transaction codes and months.
+"""
+
+import argparse
+import datetime
+
+import numpy as np
+from loguru import logger
+
+import mock_data
+import model
+from benchmarks import timer
+from benchmarks.pipeline import make_raw_transactions
+
+
+def scan(transactions, account_ids, codes, months):
+    for account_id in account_ids:
+        [t for t in transactions if t.account_id == account_id]
+    for code in codes:
+        [t for t in transactions if t.proprietary_bank_transaction_code == code]
+    for start, end in months:
+        [t for t in transactions if t.booking_date and start <= t.booking_date <= end]
+
+
+def lookup(user_data: model.UserData, account_ids, codes, months):
+    for account_id in account_ids:
+        user_data.get_account_transactions(account_id)
+    for code in codes:
+        user_data.query_transactions_by_transaction_code(code)
+    for start, end in months:
+        user_data.query_transactions_by_booking_date(start, end)
+
+
+def main(rows: int = 100_000, pages: int = 10):
+    logger.disable("model")
+    df = make_raw_transactions(rows)
+    df["account_id"] = np.array([f"account-{i}" for i in range(10)])[
+        np.arange(rows) % 10
+    ]
+    transactions = model.transactions_from_dataframe(
+        model.conform_transactions_dataframe(df)
+    )
+    for transaction in transactions:
+        transaction.booking_date = transaction.booking_date.date()
+
+    account_ids = sorted(set(df["account_id"]))
+    codes = sorted(set(df["proprietary_bank_transaction_code"]))
+    months = [
+        (datetime.date(2024, month, 1), datetime.date(2024, month, 28))
+        for month in range(1, 13)
+    ]
+    queries = (account_ids, codes, months)
+
+    results = {}
+    with timer(f"scan x{pages} pages", results):
+        for _ in range(pages):
+            scan(transactions, *queries)
+
+    for label, data in [
+        ("list", transactions),
+        ("table", model.TransactionTable.from_transactions(transactions)),
+    ]:
+        user_data = model.UserData(
+            requisition=mock_data.get_requisition(), transactions=data
+        )
+        with timer(f"{label} indexes x{pages} pages", results):
+            for _ in range(pages):
+                lookup(user_data, *queries)
+        speedup = (
+            results[f"scan x{pages} pages"] / results[f"{label} indexes x{pages} pages"]
+        )
+        logger.info(f"{label} speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=10)
+    args = parser.parse_args()
+    main(rows=args.rows, pages=args.pages)
@@ -0,0 +1,47 @@
+"""
+save_data_to_json of Transaction.to_dict records vs the bulk serializer, for a
+list of Transactions and for an enriched DataFrame.
+"""
+
+import argparse
+import filecmp
+import tempfile
+from pathlib import Path
+
+from loguru import logger
+
+import model
+import process_transactions
+import utils
+from benchmarks import timer
+from benchmarks.pipeline import make_raw_transactions
+
+
+def main(rows: int = 100_000):
+    logger.disable("process_transactions")
+    logger.disable("enrich")
+    transactions_df = model.conform_transactions_dataframe(make_raw_transactions(rows))
+    enriched_df = process_transactions.enrich_dataframe(transactions_df)
+    transactions = model.transactions_from_dataframe(enriched_df)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        expected_path = Path(directory) / "expected.json"
+        with timer("save_data_to_json", results):
+            records = [transaction.to_dict() for transaction in transactions]
+            utils.save_data_to_json(records, expected_path)
+
+        for label, data in [("list", transactions), ("dataframe", enriched_df)]:
+            path = Path(directory) / f"{label}.json"
+            with timer(label, results):
+                utils.save_chunks_to_json(model.iter_transaction_records(data), path)
+            assert filecmp.cmp(path, expected_path, shallow=False)
+            speedup = results["save_data_to_json"] / results[label]
+            logger.info(f"{label} speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    main(rows=args.rows)
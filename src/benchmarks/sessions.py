@@ -0,0 +1,123 @@
+"""
+Account API calls against a local stub server over TLS: a session per request
+(as CustomAccountApi was) vs one shared session from account_api.create_session.
+
+The stub counts the connections it accepts, each one a TCP and TLS handshake.
+Needs the openssl command line tool for a self-signed certificate.
+"""
+
+import argparse
+import asyncio
+import ssl
+import subprocess
+import tempfile
+from pathlib import Path
+
+from aiohttp import web
+from loguru import logger
+
+from benchmarks import make_account_data, timer
+from services.nordigen import account_api, config
+
+
+def make_certificate(directory: Path) -> tuple[Path, Path]:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes"]
+        + ["-keyout", str(key), "-out", str(cert), "-days", "1"]
+        + ["-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def make_stub(account_data: dict, connections: set) -> web.Application:
+    # transports rather than their ids, which are reused once closed
+    async def transactions(request):
+        connections.add(request.transport)
+        return web.json_response(
+            {"transactions": account_data[request.match_info["id"]]["transactions"]}
+        )
+
+    async def balances(request):
+        connections.add(request.transport)
+        return web.json_response(
+            {"balances": account_data[request.match_info["id"]]["balances"]}
+        )
+
+    app = web.Application()
+    app.router.add_get("/api/v2/accounts/{id}/transactions", transactions)
+    app.router.add_get("/api/v2/accounts/{id}/balances/", balances)
+    return app
+
+
+async def fetch(account_ids: list[str], session) -> list:
+    return await asyncio.gather(
+        *(
+            api.get_transactions() if endpoint else api.get_balances()
+            for account_id in account_ids
+            for api in [account_api.CustomAccountApi("token", account_id, session)]
+            for endpoint in (True, False)
+        )
+    )
+
+
+async def run(accounts: int, transactions_per_account: int, rounds: int):
+    account_data = make_account_data(
+        transactions_per_account, [f"account-{i}" for i in range(accounts)]
+    )
+    account_ids = list(account_data)
+    connections = set()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(Path(directory))
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(cert, key)
+        client_context = ssl.create_default_context(cafile=cert)
+
+        runner = web.AppRunner(make_stub(account_data, connections))
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0, ssl_context=server_context)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        config.URL_PREFIX = f"https://localhost:{port}/api/v2"
+
+        # the session per request of CustomAccountApi as it was
+        original_create_session = account_api.create_session
+        account_api.create_session = lambda: original_create_session(ssl=client_context)
+
+        results = {}
+        try:
+            with timer("session per request", results):
+                for _ in range(rounds):
+                    await fetch(account_ids, None)
+            logger.info(f"session per request: {len(connections)} connections")
+
+            connections.clear()
+            with timer("shared session", results):
+                async with original_create_session(ssl=client_context) as session:
+                    for _ in range(rounds):
+                        await fetch(account_ids, session)
+            logger.info(f"shared session: {len(connections)} connections")
+        finally:
+            account_api.create_session = original_create_session
+            await runner.cleanup()
+
+    logger.info(
+        f"speedup: {results['session per request'] / results['shared session']:.1f}x"
+    )
+
+
+def main(accounts: int = 20, transactions_per_account: int = 100, rounds: int = 10):
+    logger.disable("services")
+    asyncio.run(run(accounts, transactions_per_account, rounds))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--transactions-per-account", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    main(args.accounts, args.transactions_per_account, args.rounds)
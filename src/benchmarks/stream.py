@@ -0,0 +1,71 @@
+"""
+Peak memory (tracemalloc) of data_import.load_user_data, which decodes the whole
+file, vs data_import.iter_transaction_batches, which streams it, on a daily dump.
+"""
+
+import argparse
+import json
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from loguru import logger
+
+import data_import
+from benchmarks import make_account_data, timer
+
+
+def load(path: Path) -> int:
+    return len(data_import.load_user_data(path).transactions)
+
+
+def stream(path: Path, batch_size: int) -> int:
+    # batches are consumed as they come, as a writer or a database load would
+    return sum(
+        len(batch) for batch in data_import.iter_transaction_batches(path, batch_size)
+    )
+
+
+def peak_memory(func, *args) -> int:
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(transactions_per_account: int = 100_000, batch_size: int = 10_000):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "data.json"
+        path.write_text(json.dumps(make_account_data(transactions_per_account)))
+        logger.info(f"{path.stat().st_size / 2**20:.0f} MiB file")
+
+        with timer("load_user_data", results):
+            expected = load(path)
+        with timer("iter_transaction_batches", results):
+            assert stream(path, batch_size) == expected
+
+        for label, func, args in [
+            ("load_user_data", load, (path,)),
+            ("iter_transaction_batches", stream, (path, batch_size)),
+        ]:
+            results[f"{label} peak"] = peak_memory(func, *args)
+            logger.info(
+                f"{label} peak memory: {results[f'{label} peak'] / 2**20:.0f} MiB"
+            )
+
+    logger.info(
+        "peak memory: "
+        f"{results['load_user_data peak'] / results['iter_transaction_batches peak']:.1f}x"
+        " smaller"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions-per-account", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.transactions_per_account, args.batch_size)
@@ -0,0 +1,100 @@
+"""
+Memory and construction time of Transactions, slotted with lazy dates vs a
+dict-backed dataclass parsing its dates in __post_init__ (Transaction as it was),
+and of a TransactionTable of the same transactions.
+"""
+
+import argparse
+import dataclasses
+import tracemalloc
+
+from loguru import logger
+
+import model
+from benchmarks import timer
+from benchmarks.pipeline import make_raw_transactions
+
+
+def _parse_dates(self):
+    self.enforce_types()
+    for field, date_format in model.TRANSACTION_DATE_FIELDS.items():
+        value = getattr(self, field)
+        if isinstance(value, str):
+            setattr(self, field, model._parse_date(value, date_format))
+
+
+EagerTransaction = dataclasses.make_dataclass(
+    "EagerTransaction",
+    [(field.name, field.type, None) for field in dataclasses.fields(model.Transaction)],
+    namespace={
+        "enforce_types": model.Transaction.enforce_types,
+        "__post_init__": _parse_dates,
+    },
+)
+
+
+def build(cls, records: list[dict]) -> list:
+    return [cls(**d) for d in records]
+
+
+def build_table(records: list[dict]) -> model.TransactionTable:
+    return model.TransactionTable.from_transactions(build(model.Transaction, records))
+
+
+def allocated(func, *args) -> int:
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        del result
+
+
+def main(rows: int = 100_000):
+    df = make_raw_transactions(rows)
+    df["booking_date_time"] = df["booking_date"] + "T10:00:00Z"
+    records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+    results = {}
+    for label, cls in [("dict", EagerTransaction), ("slotted", model.Transaction)]:
+        with timer(f"{label} construction", results):
+            transactions = build(cls, records)
+        with timer(f"{label} read booking_date", results):
+            max(transaction.booking_date for transaction in transactions)
+        del transactions
+
+        size = allocated(build, cls, records)
+        results[label] = size
+        logger.info(f"{label}: {size / 2**20:.1f} MiB per {rows} transactions")
+
+    transactions = build(model.Transaction, records)
+    account_id = transactions[0].account_id
+    with timer("list filter", results):
+        [t for t in transactions if t.account_id == account_id and t.amount < 0]
+
+    table = build_table(records)
+    with timer("table filter", results):
+        table[table.mask("account_id", account_id) & (table.columns["amount"] < 0)]
+    del transactions, table
+
+    size = allocated(build_table, records)
+    results["table"] = size
+    logger.info(f"table: {size / 2**20:.1f} MiB per {rows} transactions")
+
+    logger.info(f"memory: {results['dict'] / results['slotted']:.1f}x smaller")
+    logger.info(f"table memory: {results['slotted'] / results['table']:.1f}x smaller")
+    logger.info(
+        f"filter: {results['list filter'] / results['table filter']:.1f}x faster"
+    )
+    logger.info(
+        "construction: "
+        f"{results['dict construction'] / results['slotted construction']:.1f}x faster"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    main(rows=args.rows)
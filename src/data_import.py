@@ -1,67 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
 from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+from loguru import logger
 
 import mock_data
 import data_parsers
 import model
+from json_stream import JsonStream
+
+TRANSACTION_STATUSES = ["booked", "pending"]
+
+
+def parse_account_name(
+    account_details: model.CurrentAccountDetails | model.CreditCardDetails,
+):
+    if isinstance(account_details, model.CurrentAccountDetails):
+        account_name = account_details.name
+        return account_name
+    elif isinstance(account_details, model.CreditCardDetails):
+        account_name = account_details.details
+        return account_name
+    else:
+        raise ValueError(f"Unknown account type: {type(account_details)}")
+
+
+@dataclass
+class ParsedAccount:
+    """Parsed data of one account, see parse_account."""
+
+    metadata: model.AccountMetadata
+    details: model.CurrentAccountDetails | model.CreditCardDetails
+    balances: model.AccountBalances
+    account_name: str
+    # list[model.Transaction], or a column per Transaction field
+    transactions: list[model.Transaction] | dict[str, list]
+
+
+def parse_account(
+    account_id: str, account_data: dict, as_table: bool = False
+) -> ParsedAccount:
+    """
+    Parse and validate the data of one account, where
+    account_data = data.get(account_id).
+
+    Args:
+        account_id (str): Account id.
+        account_data (dict): Raw account data.
+        as_table (bool): Parse transactions to columns rather than Transactions.
+    """
+    # parse details and account account name
+    parsed_account_details = data_parsers.parse_account_details(account_data)
+    account_name = parse_account_name(parsed_account_details)
+    account_type = account_data.get("account").get("cashAccountType")
+
+    if as_table:
+        # straight to columns, without Transaction objects
+        parse_transactions = data_parsers.parse_account_transaction_columns
+    else:
+        parse_transactions = data_parsers.parse_account_transactions
+
+    return ParsedAccount(
+        metadata=data_parsers.parse_metadata(account_data),
+        details=parsed_account_details,
+        balances=data_parsers.parse_account_balances(account_data),
+        account_name=account_name,
+        transactions=parse_transactions(
+            account_data=account_data,
+            account_id=account_id,
+            account_name=account_name,
+            account_type=account_type,
+        ),
+    )
+
 
+def load_user_data(
+    filepath: Path = mock_data.MOCK_PATH,
+    as_table: bool = False,
+    parallel: bool = False,
+    max_workers: int = None,
+):
+    """
+    Load user data from a json file of account data.
 
-def load_user_data(filepath: Path = mock_data.MOCK_PATH):
+    Args:
+        filepath (Path): Account data by account id.
+        as_table (bool): Store transactions in a model.TransactionTable rather
+            than a list of Transactions.
+        parallel (bool): Parse accounts concurrently in a process pool. Each
+            worker receives the raw data of one account, so wall time follows
+            the largest account rather than the sum of all accounts.
+        max_workers (int): Number of worker processes when parallel, defaults
+            to the number of CPUs.
+    """
     # user level
     data, requisition = mock_data.load_data(data_filepath=filepath)
     metadata = model.UserAccountMetadata(accounts={})
     details = model.UserAccountDetails()
     balances = model.UserAccountBalances()
     transactions = []
-    # import an account
-
-    def parse_account_name(
-        account_details: model.CurrentAccountDetails | model.CreditCardDetails,
-    ):
-        if isinstance(account_details, model.CurrentAccountDetails):
-            account_name = account_details.name
-            return account_name
-        elif isinstance(account_details, model.CreditCardDetails):
-            account_name = account_details.details
-            return account_name
-        else:
-            raise ValueError(f"Unknown account type: {type(account_details)}")
+    columns = {field: [] for field in model.TRANSACTION_FIELDS}
 
-    for account_id in requisition.accounts:
-        # read all data
-        account_data = data.get(account_id)
+    # import accounts
+    account_ids = list(requisition.accounts)
+    account_data = [data.get(account_id) for account_id in account_ids]
+    if parallel and len(account_ids) > 1:
+        # workers return transactions as columns, much cheaper to send back
+        # than Transaction objects
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed_accounts = list(
+                executor.map(parse_account, account_ids, account_data, repeat(True))
+            )
+        if not as_table:
+            for parsed_account in parsed_accounts:
+                parsed_account.transactions = data_parsers.transactions_from_columns(
+                    parsed_account.transactions
+                )
+    else:
+        parsed_accounts = map(
+            parse_account, account_ids, account_data, repeat(as_table)
+        )
 
-        # parse and validate
+    # merge in requisition order
+    for account_id, parsed_account in zip(account_ids, parsed_accounts):
         metadata.add_account(
-            account_id=account_id,
-            account_metadata=data_parsers.parse_metadata(account_data),
+            account_id=account_id, account_metadata=parsed_account.metadata
         )
 
-        # parse details and account account name
-        parsed_account_details = data_parsers.parse_account_details(account_data)
-        account_name = parse_account_name(parsed_account_details)
-        account_type = account_data.get("account").get("cashAccountType")
-
         # update user details
-        details.add_account(
-            account_id=account_id,
-            account=parsed_account_details,
-        )
+        details.add_account(account_id=account_id, account=parsed_account.details)
 
         # update user balances
         balances.set_account_balances(
             account_id=account_id,
-            balance=data_parsers.parse_account_balances(account_data),
-            account_name=account_name,
+            balance=parsed_account.balances,
+            account_name=parsed_account.account_name,
         )
 
         # update user transactions
-        account_transactions = data_parsers.parse_account_transactions(
-            account_data=account_data,
-            account_id=account_id,
-            account_name=account_name,
-            account_type=account_type,
-        )
-        transactions.extend(account_transactions)
+        if as_table:
+            for field, column in parsed_account.transactions.items():
+                columns[field].extend(column)
+        else:
+            transactions.extend(parsed_account.transactions)
+
+    if as_table:
+        transactions = model.TransactionTable.from_dataframe(pd.DataFrame(columns))
 
     user_data = model.UserData(
         requisition=requisition,
@@ -72,3 +159,91 @@ def load_user_data(filepath: Path = mock_data.MOCK_PATH):
     )
     # return user_data,  transactions
     return user_data
+
+
+def _parse_transaction_batch(
+    batch: list[dict], status: str, account_id: str, account: dict | None
+) -> list[model.Transaction]:
+    account_name, account_type = None, None
+    if account:
+        account_name = parse_account_name(
+            data_parsers.parse_account_details({"account": account})
+        )
+        account_type = account.get("cashAccountType")
+
+    transactions = {other_status: [] for other_status in TRANSACTION_STATUSES}
+    transactions[status] = batch
+    return data_parsers.parse_account_transactions(
+        account_data={"transactions": transactions},
+        account_id=account_id,
+        account_name=account_name,
+        account_type=account_type,
+    )
+
+
+def _iter_account_transaction_batches(
+    stream: JsonStream, account_id: str, batch_size: int
+) -> Iterator[list[model.Transaction]]:
+    account = None
+    # transactions read before the account details, parsed once they are known
+    unparsed = []
+
+    for key in stream.keys():
+        if key == "account":
+            account = stream.value()
+        elif key != "transactions":
+            stream.skip()
+        elif account is None:
+            logger.warning(f"transactions before account details for {account_id}")
+            unparsed.append(stream.value())
+        else:
+            for status in stream.keys():
+                if status not in TRANSACTION_STATUSES:
+                    stream.skip()
+                    continue
+                batch = []
+                for _ in stream.elements():
+                    batch.append(stream.value())
+                    if len(batch) == batch_size:
+                        yield _parse_transaction_batch(
+                            batch, status, account_id, account
+                        )
+                        batch = []
+                if batch:
+                    yield _parse_transaction_batch(batch, status, account_id, account)
+
+    for transactions in unparsed:
+        for status in TRANSACTION_STATUSES:
+            section = transactions.get(status) or []
+            for start in range(0, len(section), batch_size):
+                yield _parse_transaction_batch(
+                    section[start : start + batch_size], status, account_id, account
+                )
+
+
+def iter_transaction_batches(
+    filepath: Path = mock_data.MOCK_PATH, batch_size: int = 10_000
+) -> Iterator[list[model.Transaction]]:
+    """
+    Parse the transactions of a json file of account data, in batches.
+
+    Unlike load_user_data, the file is read incrementally, one account and
+    one transaction at a time, so memory is bounded by batch_size rather than
+    by the size of the file. Transactions come in file order, those of
+    accounts outside the requisition are skipped.
+
+    Args:
+        filepath (Path): Account data by account id.
+        batch_size (int): Maximum number of transactions per batch.
+
+    Yields:
+        list[model.Transaction]: Transactions of one account and status.
+    """
+    account_ids = set(mock_data.get_requisition().accounts)
+    with open(filepath, "r") as file:
+        stream = JsonStream(file)
+        for account_id in stream.keys():
+            if account_id not in account_ids:
+                stream.skip()
+                continue
+            yield from _iter_account_transaction_batches(stream, account_id, batch_size)
@@ -1,41 +1,39 @@
-import copy
+import itertools
+from functools import lru_cache
 
-import pandas as pd
+from pydantic import TypeAdapter
 
 import model
 import utils
 
+# validates a raw list of balances in one call
+BALANCES_ADAPTER = TypeAdapter(list[model.Balance])
+
+# Transaction fields of nested Nordigen transaction keys, flattened with dots.
+# Other keys map to the snake_case of their last part.
+TRANSACTION_KEY_FIELDS = {
+    "transactionAmount.amount": "amount",
+    "transactionAmount.currency": "currency",
+    "currencyExchange.instructedAmount.amount": "instructed_amount",
+    "currencyExchange.instructedAmount.currency": "instructed_currency",
+    "currencyExchange.sourceCurrency": "source_currency",
+    "currencyExchange.exchangeRate": "exchange_rate",
+    "currencyExchange.unitCurrency": "unit_currency",
+    "currencyExchange.targetCurrency": "target_currency",
+    "currencyExchange.quotationDate": "quotation_date",
+}
+TRANSACTION_FIELD_POSITIONS = {
+    field: position for position, field in enumerate(model.TRANSACTION_FIELDS)
+}
+
 
 def parse_current_account_details(details):
-    adjusted_details = copy.deepcopy(details)
-    adjusted_details = utils.rename_keys(
-        adjusted_details,
-        {
-            "resourceId": utils.to_snake_case_with_dots("resourceId"),
-            "bban": utils.to_snake_case_with_dots("bban"),
-            "currency": utils.to_snake_case_with_dots("currency"),
-            "name": utils.to_snake_case_with_dots("name"),
-            "cashAccountType": utils.to_snake_case_with_dots("cashAccountType"),
-        },
-    )
-    adjusted_details = model.CurrentAccountDetails.model_validate(adjusted_details)
-    return adjusted_details
+    # camelCase keys are validated through the model aliases
+    return model.CurrentAccountDetails.model_validate(details)
 
 
 def parse_card_details(details):
-    adjusted_details = copy.deepcopy(details)
-    adjusted_details = utils.rename_keys(
-        adjusted_details,
-        {
-            "resourceId": utils.to_snake_case_with_dots("resourceId"),
-            "currency": utils.to_snake_case_with_dots("currency"),
-            "cashAccountType": utils.to_snake_case_with_dots("cashAccountType"),
-            "maskedPan": utils.to_snake_case_with_dots("maskedPan"),
-            "details": utils.to_snake_case_with_dots("details"),
-        },
-    )
-    credit_card_details = model.CreditCardDetails.model_validate(adjusted_details)
-    return credit_card_details
+    return model.CreditCardDetails.model_validate(details)
 
 
 def parse_account_details(account_data):
@@ -55,52 +53,81 @@ def parse_metadata(data):
 
 
 def parse_account_balances(account_data):
-    def get_balances(balance_data: list[dict]):
-        return {
-            b.get(
-                utils.to_snake_case_with_dots("balanceType")
-            ): model.Balance.model_validate(b)
-            for b in balance_data
-        }
-
-    balance_data = copy.deepcopy(account_data.get("balances"))
-    balance_data = utils.rename_keys(
-        balance_data,
-        {
-            "balanceAmount": utils.to_snake_case_with_dots("balanceAmount"),
-            "balanceType": utils.to_snake_case_with_dots("balanceType"),
-            "referenceDate": utils.to_snake_case_with_dots("referenceDate"),
-        },
-    )
-    return model.AccountBalances(balances=get_balances(balance_data))
+    balances = BALANCES_ADAPTER.validate_python(account_data.get("balances"))
+    return model.AccountBalances(balances={b.balance_type: b for b in balances})
 
 
-def parse_account_transactions(
+def _transaction_field(key: str) -> str | None:
+    field = TRANSACTION_KEY_FIELDS.get(key)
+    if field is None:
+        field = utils.clean_column_name(key)
+    return TRANSACTION_FIELD_POSITIONS.get(field)
+
+
+@lru_cache(maxsize=2**10)
+def _transaction_schema(prefix: str, keys: tuple[str, ...]) -> tuple:
+    """
+    Path and Transaction field position of each key of a raw transaction (or of
+    an object nested under prefix), computed once per set of keys. Keys of
+    nested objects have no field.
+    """
+    return tuple((key, prefix + key, _transaction_field(prefix + key)) for key in keys)
+
+
+def _fill_transaction_columns(columns: list[list], row: int, data: dict, prefix=""):
+    for key, path, position in _transaction_schema(prefix, tuple(data)):
+        value = data[key]
+        if isinstance(value, dict):
+            _fill_transaction_columns(columns, row, value, path + ".")
+        elif position is None:
+            raise TypeError(f"unexpected transaction key: {path}")
+        else:
+            columns[position][row] = value
+
+
+def parse_account_transaction_columns(
     account_data, account_id, account_name=None, account_type=None
-):
+) -> dict[str, list]:
     """
-    Process account level transactions where account_data = data.get(account_id)
+    Account level transactions as a column per model.Transaction field, where
+    account_data = data.get(account_id). Missing values are None.
 
     """
     account_transactions = account_data.get("transactions")
-    booked = pd.json_normalize(account_transactions.get("booked"))
-    pending = pd.json_normalize(account_transactions.get("pending"))
-    if len(booked) != 0:
-        booked["status"] = "booked"
-
-    if len(pending) != 0:
-        pending["status"] = "pending"
-    df = pd.concat([booked, pending])
-    df["account_id"] = account_id
+    booked = account_transactions.get("booked") or []
+    pending = account_transactions.get("pending") or []
+    rows = len(booked) + len(pending)
+
+    columns = [[None] * rows for _ in model.TRANSACTION_FIELDS]
+    for row, transaction in enumerate(itertools.chain(booked, pending)):
+        _fill_transaction_columns(columns, row, transaction)
+    columns = dict(zip(model.TRANSACTION_FIELDS, columns))
+
+    columns["status"] = ["booked"] * len(booked) + ["pending"] * len(pending)
+    columns["account_id"] = [account_id] * rows
     if account_type:
-        df["account_type"] = account_type
+        columns["account_type"] = [account_type] * rows
 
     if account_name:
-        df["account_name"] = account_name
-
-    account_transactions = df.to_dict(orient="records")
-    account_transactions = utils.clean_column_names(account_transactions)
-    account_transactions = [
-        model.Transaction(**element) for element in account_transactions
-    ]
-    return account_transactions
+        columns["account_name"] = [account_name] * rows
+
+    return columns
+
+
+def parse_account_transactions(
+    account_data, account_id, account_name=None, account_type=None
+):
+    """
+    Process account level transactions where account_data = data.get(account_id)
+
+    """
+    columns = parse_account_transaction_columns(
+        account_data, account_id, account_name, account_type
+    )
+    return transactions_from_columns(columns)
+
+
+def transactions_from_columns(columns: dict[str, list]) -> list[model.Transaction]:
+    """Transactions of parse_account_transaction_columns."""
+    # columns are in field order
+    return [model.Transaction(*values) for values in zip(*columns.values())]
@@ -1,8 +1,29 @@
+import hashlib
+import inspect
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 from loguru import logger
 
 import utils
-from enrich.mappings import DESCRIPTION, CODE, COUNTERPARTY, EMPLOYERS
+from enrich.keywords import KeywordMatcher
+from enrich.mappings import DESCRIPTION, CODE, COUNTERPARTY
+from enrich.memo import DistinctKeyCache
+
+UNLABELLED = "unlabelled"
+# text columns read by the vectorized rules
+RULE_COLUMNS = [DESCRIPTION, CODE, COUNTERPARTY]
+# columns the category of a transaction depends on
+MEMO_COLUMNS = [DESCRIPTION, CODE, COUNTERPARTY]
+# rule file with the keyword lists of the rules below, see enrich/rules.py
+RULES_PATH = Path(__file__).with_name("rules.yaml")
+KEYWORDS: dict[str, list[str]] = utils.read_yaml(RULES_PATH)["keywords"]
 
 
 def clean_df(transactions_df: pd.DataFrame):
@@ -14,32 +35,280 @@ def clean_df(transactions_df: pd.DataFrame):
     return df
 
 
+def contains(series: pd.Series, text: str, case: bool = True) -> pd.Series:
+    """Vectorized `text in value`, treating missing values as no match."""
+    return series.str.contains(text, case=case, regex=False, na=False)
+
+
 class TransactionCategorizer:
     def __init__(self):
         self.category_functions = []
+        self.category_rules = []
+        self.category_cache = DistinctKeyCache()
+        # columns the categories depend on, the key of category_cache
+        self.memo_columns = MEMO_COLUMNS
+        self.rule_stats = None
+
+    def enable_profiling(self):
+        """Record per rule timings and hit rates in rule_stats, see get_rule_stats."""
+        self.rule_stats = {}
+
+    def disable_profiling(self):
+        self.rule_stats = None
+
+    def _record(self, name: str, engine: str, rows: int, matches: int, seconds: float):
+        stats = self.rule_stats.setdefault(
+            name,
+            {
+                "engine": engine,
+                "calls": 0,
+                "rows": 0,
+                "matches": 0,
+                "seconds": 0.0,
+                "unlabelled_after": 0,
+            },
+        )
+        stats["calls"] += 1
+        stats["rows"] += rows
+        stats["matches"] += matches
+        stats["seconds"] += seconds
+        stats["unlabelled_after"] += rows - matches
+
+    def get_rule_stats(self) -> dict[str, dict]:
+        """
+        Per rule statistics recorded since profiling was enabled.
+
+        For each categorization function (row-wise) or rule (vectorized):
+            calls: number of evaluations, once per row reaching a function or
+                once per DataFrame for a rule.
+            rows: rows still unlabelled when it was evaluated.
+            matches: rows it labelled.
+            seconds: cumulative evaluation time.
+            unlabelled_after: rows still unlabelled after it was evaluated.
+
+        With memoize=True rows are distinct keys rather than transactions.
+        """
+        if self.rule_stats is None:
+            raise ValueError("profiling is not enabled, see enable_profiling")
+        return {name: dict(stats) for name, stats in self.rule_stats.items()}
+
+    def get_rule_stats_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame.from_dict(self.get_rule_stats(), orient="index")
+        df.index.name = "rule"
+        return df
+
+    def rules_version(self) -> str:
+        """
+        Hash of the source of the modules defining the registered functions and
+        rules, and of the keyword lists they loaded, changes whenever a rule or
+        keyword list is edited.
+        """
+        modules = sorted(
+            {
+                func.__module__
+                for func in self.category_functions
+                + [condition for _, condition in self.category_rules]
+            }
+        )
+        digest = hashlib.sha256()
+        for module in modules:
+            digest.update(inspect.getsource(sys.modules[module]).encode())
+            # keyword lists loaded from a rule file are not in the source
+            matcher = getattr(sys.modules[module], "keyword_matcher", None)
+            if isinstance(matcher, KeywordMatcher):
+                digest.update(json.dumps(matcher.keyword_lists).encode())
+        for category, condition in self.category_rules:
+            digest.update(f"{category}:{condition.__qualname__}".encode())
+        return digest.hexdigest()
 
     def register(self, func):
         """Register a new categorization function."""
         self.category_functions.append(func)
+        self.category_cache.clear()
+
+    def register_rule(self, category: str, condition):
+        """
+        Register a vectorized rule.
+
+        Args:
+            category (str): Label given to rows matching the rule.
+            condition (Callable[[pd.DataFrame], pd.Series]): Returns a boolean
+                mask over the whole DataFrame.
+        """
+        self.category_rules.append((category, condition))
+        self.category_cache.clear()
 
     def _apply_functions(self, row):
         """Apply registered categorization functions to a DataFrame row."""
 
         for func in self.category_functions:
-            row = func(row)
+            if self.rule_stats is None:
+                row = func(row)
+            else:
+                start = time.perf_counter()
+                row = func(row)
+                self._record(
+                    func.__name__,
+                    engine="row-wise",
+                    rows=1,
+                    matches=int(row["category"] != "unlabelled"),
+                    seconds=time.perf_counter() - start,
+                )
             if row["category"] != "unlabelled":
                 break
         return row
 
-    def categorize_transactions(self, df) -> pd.DataFrame:
+    def _apply_rules(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Label a DataFrame column-wise, the first matching rule wins."""
+        # dictionary-encode the text columns so string matching runs once per
+        # distinct value rather than once per row
+        encoded = df.assign(
+            **{
+                column: df[column].astype("category")
+                for column in RULE_COLUMNS
+                if column in df.columns
+            }
+        )
+        categories = [category for category, _ in self.category_rules]
+        if self.rule_stats is None:
+            conditions = [
+                condition(encoded).to_numpy(dtype=bool)
+                for _, condition in self.category_rules
+            ]
+        else:
+            conditions = self._profile_rules(encoded)
+        df["category"] = np.select(conditions, categories, default=UNLABELLED)
+        return df
+
+    def _profile_rules(self, encoded: pd.DataFrame) -> list[np.ndarray]:
+        conditions = []
+        unlabelled = np.ones(len(encoded), dtype=bool)
+        for category, condition in self.category_rules:
+            start = time.perf_counter()
+            is_match = condition(encoded).to_numpy(dtype=bool)
+            seconds = time.perf_counter() - start
+
+            self._record(
+                category,
+                engine="vectorized",
+                rows=int(unlabelled.sum()),
+                matches=int((is_match & unlabelled).sum()),
+                seconds=seconds,
+            )
+            unlabelled &= ~is_match
+            conditions.append(is_match)
+        return conditions
+
+    def _label(self, df: pd.DataFrame, vectorized: bool) -> pd.DataFrame:
+        if vectorized and self.category_rules:
+            return self._apply_rules(df)
+        return df.apply(self._apply_functions, axis=1)
+
+    def categorize_transactions(
+        self, df, vectorized: bool = True, memoize: bool = False
+    ) -> pd.DataFrame:
+        """
+        Categorize transactions in a DataFrame.
+
+        Args:
+            df (pd.DataFrame): Transactions to categorize.
+            vectorized (bool): Use the registered vectorized rules. Falls back to
+                the row-wise categorization functions when False or when no
+                rules are registered.
+            memoize (bool): Categorize each distinct key of memo_columns, by
+                default (description, code, counterparty), once, reusing
+                results from category_cache.
+
+        Returns:
+            pd.DataFrame: Copy of df with a "category" column.
+        """
         logger.info(f"Adding transactions category")
-        """Categorize transactions in a DataFrame using registered functions."""
+        return self._categorize(df, vectorized=vectorized, memoize=memoize)
+
+    def categorize_transactions_parallel(
+        self,
+        df,
+        max_workers: int = None,
+        chunk_size: int = 100_000,
+        vectorized: bool = True,
+        memoize: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Categorize transactions in row chunks across a process pool.
+
+        Each worker receives a copy of this categorizer once, when it starts, and
+        the labelled chunks are concatenated in order, so the result is the same
+        as categorize_transactions. Profiling stats are not collected from workers.
+
+        Args:
+            df (pd.DataFrame): Transactions to categorize.
+            max_workers (int): Number of worker processes, defaults to the number
+                of CPUs.
+            chunk_size (int): Rows per chunk.
+            vectorized (bool): See categorize_transactions.
+            memoize (bool): See categorize_transactions, each worker keeps its
+                own cache.
+
+        Returns:
+            pd.DataFrame: Copy of df with a "category" column.
+        """
+        logger.info(f"Adding transactions category in chunks of {chunk_size} rows")
+        if len(df) <= chunk_size:
+            return self._categorize(df, vectorized=vectorized, memoize=memoize)
+
+        chunks = [df.iloc[i : i + chunk_size] for i in range(0, len(df), chunk_size)]
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            labelled_chunks = list(
+                executor.map(
+                    _categorize_chunk, chunks, repeat(vectorized), repeat(memoize)
+                )
+            )
+        return pd.concat(labelled_chunks)
+
+    def _categorize(self, df, vectorized: bool, memoize: bool) -> pd.DataFrame:
         df = clean_df(df.copy())
-        df["category"] = "unlabelled"
-        return df.apply(self._apply_functions, axis=1)
+        df["category"] = UNLABELLED
+        if memoize:
+            key_columns = [
+                column for column in self.memo_columns if column in df.columns
+            ]
+            df["category"] = self.category_cache.apply(
+                df,
+                key_columns,
+                lambda rows: self._label(rows.copy(), vectorized)["category"],
+            )
+            return df
+        return self._label(df, vectorized)
+
+    def __getstate__(self):
+        # caches and profiling stay with the process that owns them
+        state = self.__dict__.copy()
+        state["category_cache"] = DistinctKeyCache(self.category_cache.maxsize)
+        state["rule_stats"] = None
+        return state
+
+
+# categorizer of a categorize_transactions_parallel worker process
+_worker_categorizer: TransactionCategorizer = None
+
+
+def _init_worker(categorizer: TransactionCategorizer):
+    global _worker_categorizer
+    _worker_categorizer = categorizer
+
+
+def _categorize_chunk(chunk: pd.DataFrame, vectorized: bool, memoize: bool):
+    return _worker_categorizer._categorize(
+        chunk, vectorized=vectorized, memoize=memoize
+    )
 
 
 # Define categorization functions
+EMPLOYERS = KEYWORDS["employers"]
+
+
 def category_salary(row):
     if row["category"] != "unlabelled":
         return row
@@ -52,6 +321,12 @@ def category_salary(row):
     return row
 
 
+def is_salary(df: pd.DataFrame) -> pd.Series:
+    is_bank_transfer = df[CODE] == "BANK TRANSFER CREDIT"
+    is_employer = keyword_matcher.matches(df[COUNTERPARTY], "employers")
+    return is_bank_transfer & is_employer
+
+
 def category_interest_income(row):
     if row["category"] != "unlabelled":
         return row
@@ -70,6 +345,14 @@ def category_interest_income(row):
     return row
 
 
+def is_interest_income(df: pd.DataFrame) -> pd.Series:
+    is_interest_paid = contains(df[DESCRIPTION], "interest paid")
+    is_interest_paid_credit = contains(df[DESCRIPTION], "credit interest")
+    is_cashback = contains(df[DESCRIPTION], "cashback")
+    is_cashback_method = contains(df[CODE], "CASHBACK")
+    return is_interest_paid | is_interest_paid_credit | is_cashback | is_cashback_method
+
+
 ACCOUNT_TRANSFER = "own account transfer"
 
 
@@ -101,6 +384,32 @@ def category_own_account_transfer(row):
     return row
 
 
+def is_own_account_transfer(df: pd.DataFrame) -> pd.Series:
+    is_credit_card_payment = contains(df[DESCRIPTION], "credit card payment")
+    is_my_transfer = contains(df[DESCRIPTION], "transfer to mr matthew david stewart")
+    is_my_transfer_received = contains(
+        df[DESCRIPTION], "transfer from mr matthew david stewart"
+    )
+    is_faster_payment = contains(df[DESCRIPTION], "faster payment")
+    is_received_payment = contains(df[CODE], "FASTER PAYMENT RECEIVED", case=False)
+    is_faster_payment_receipt = contains(df[CODE], "FASTER PAYMENT RECEIPT", case=False)
+    is_vanguard = contains(df[COUNTERPARTY], "vanguard asset management")
+    is_solium = contains(df[COUNTERPARTY], "solium capital")
+    is_bank_credit = contains(df[CODE], "BANK TRANSFER CREDIT")
+    return (
+        is_credit_card_payment
+        | is_my_transfer
+        | is_my_transfer_received
+        | (is_faster_payment & is_received_payment)
+        | (is_vanguard & is_faster_payment_receipt)
+        | (is_solium & is_bank_credit)
+    )
+
+
+def is_faster_payments_receipt(df: pd.DataFrame) -> pd.Series:
+    return contains(df[CODE], "FASTER PAYMENT RECEIPT", case=False)
+
+
 def category_childcare(row):
     if row["category"] != "unlabelled":
         return row
@@ -112,15 +421,13 @@ def category_childcare(row):
     return row
 
 
-UTILITY_PROVIDERS = [
-    "scottishpower",
-    "ee limited",
-    "seethelight",
-    "thames water",
-    "apple.com/bill",
-    "chatgpt subscription",
-    "tv licence",
-]
+def is_childcare(df: pd.DataFrame) -> pd.Series:
+    is_gov_uk = contains(df[DESCRIPTION], "gov")
+    is_blair_reference = contains(df[DESCRIPTION], "1100049398055")
+    return is_gov_uk & is_blair_reference
+
+
+UTILITY_PROVIDERS = KEYWORDS["utilities"]
 
 
 def category_utilities(row):
@@ -134,7 +441,11 @@ def category_utilities(row):
     return row
 
 
-HOME_SERVICE_PROVIDERS = ["mr dax baker", "townsends cleani", "cerisa sansum"]
+def is_utilities(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[COUNTERPARTY], "utilities")
+
+
+HOME_SERVICE_PROVIDERS = KEYWORDS["home services"]
 
 
 def category_home_services(row):
@@ -150,48 +461,11 @@ def category_home_services(row):
     return row
 
 
-EATING_OUT_PROVIDERS = [
-    "mcdonalds",
-    "kfc",
-    "burger king",
-    "bk",
-    "five guys",
-    "zpos* swindon",
-    "dominos",
-    "costa",
-    "subway",
-    "costa coffee",
-    "coffee",
-    "pizza hut",
-    "blundson arms",
-    "harvester",
-    "greek olive",
-    "greggs",
-    "starbucks",
-    "just eat",
-    "uber eats",
-    "sims chippy",
-    "goddard arms",
-    "olive tree",
-    "nandos",
-    "itsu",
-    "benugo",
-    "pret a manger",
-    "gulshan brasserie",
-    "sq *balulas",
-    "pizza",
-    "pizzaexpress",
-    "swindon rendezvous",
-    "frosts garden",
-    "cornish bakehouse bath gb",
-    "project coffee",
-    "greek euros ltd",
-    "fratellos swindon",
-    "sweet little thing",
-    "hall and woodhouse",
-    "*eat",
-    "mollies",
-]
+def is_home_services(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "home services")
+
+
+EATING_OUT_PROVIDERS = KEYWORDS["eating out"]
 
 
 def category_eating_out(row):
@@ -205,25 +479,11 @@ def category_eating_out(row):
     return row
 
 
-GROCERY_PROVIDERS = [
-    "co-operative",
-    "co operative food",
-    "sainsburys",
-    "sainsbury's",
-    "s pubs",
-    "marks & spencer",
-    "marks&spencer",
-    "tesco stores",
-    "tesco subscription",
-    "icelandfood",
-    "iceland foods",
-    "aldi stores",
-    "lidl",
-    "aldi",
-    "gousto",
-    "asda stores",
-    "asda",
-]
+def is_eating_out(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "eating out")
+
+
+GROCERY_PROVIDERS = KEYWORDS["groceries"]
 
 
 def category_groceries(row):
@@ -240,7 +500,14 @@ def category_groceries(row):
     return row
 
 
-HOUSING = ["virgin money", "swindon bc central"]
+def is_groceries(df: pd.DataFrame) -> pd.Series:
+    is_provider = keyword_matcher.matches(df[DESCRIPTION], "groceries")
+    not_fuel = ~contains(df[DESCRIPTION], "fuel")
+    not_petrol = ~contains(df[DESCRIPTION], "petr")
+    return is_provider & not_fuel & not_petrol
+
+
+HOUSING = KEYWORDS["housing"]
 
 
 def category_housing(row):
@@ -254,7 +521,11 @@ def category_housing(row):
     return row
 
 
-DEBT = ["slc receipts", "creation.co.uk", "student loans co"]
+def is_housing(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "housing")
+
+
+DEBT = KEYWORDS["debt"]
 
 
 def category_debt(row):
@@ -268,26 +539,11 @@ def category_debt(row):
     return row
 
 
-TRANSPORT = [
-    "hcp capital uk",
-    "fish brothers kia",
-    "applegreen swindon",
-    "waves at",
-    "bucksrailcentre",
-    "trainline",
-    "hks saxon bletchley" "tfl london",
-    "tfl travel",
-    "holmrook  s.stn",
-    "parking",
-    "go south coast",
-    "apcoa parking",
-    "thamesdown tyres",
-    "esso",
-    "first york",
-    "garage",
-    "shell",
-    "ref mmv310288591",
-]
+def is_debt(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "debt")
+
+
+TRANSPORT = KEYWORDS["transport"]
 
 
 def category_transport(row):
@@ -302,26 +558,14 @@ def category_transport(row):
     return row
 
 
-TRAVEL = [
-    "paris 2024",
-    "doubletree",
-    "holiday inn",
-    "gwr swindon",
-    "big bus tours",
-    "hm passport office",
-    "ravenglass & eskdale r",
-    "scottish seabird centr",
-    "airbnb",
-    "roves farm swindon gb",
-    "roman baths",
-    "seton sand",
-    "barnestravel",
-    "booking.com",
-    "kinggeorge-eskdale.com",
-    "b h inn",
-    "jubilee garage",
-    "king george iv inn holmrook",
-]
+def is_transport(df: pd.DataFrame) -> pd.Series:
+    is_provider = keyword_matcher.matches(df[DESCRIPTION], "transport")
+    is_fuel = contains(df[DESCRIPTION], "fuel")
+    is_petrol = contains(df[DESCRIPTION], "petrol")
+    return is_provider | is_fuel | is_petrol
+
+
+TRAVEL = KEYWORDS["travel"]
 
 
 def category_travel(row):
@@ -335,31 +579,11 @@ def category_travel(row):
     return row
 
 
-ENTERTAINMENT = [
-    "microsoft*xbox",
-    "microsoft*subscription",
-    "voucher express",
-    "blizzard entertainment",
-    "cotswold wildlife park",
-    "theatre by the lake",
-    "steamgames",
-    "gymcastic",
-    "stretches & strokes",
-    "unite the union",
-    "steam purchase",
-    "the spectator",
-    "toddler town",
-    "lw theatres group",
-    "microsoft*ultim msbill",
-    "rookery farm",
-    "party warehouse",
-    "games lore",
-    "event attractions",
-    "firestorm cards",
-    "uk games expo",
-    "jagex.com",
-    "sp computers",
-]
+def is_travel(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "travel")
+
+
+ENTERTAINMENT = KEYWORDS["entertainment"]
 
 
 def category_entertainment(row):
@@ -373,46 +597,11 @@ def category_entertainment(row):
     return row
 
 
-SHOPPING = [
-    "amazon",
-    "amznmktplace",
-    "faceface",
-    "under armour",
-    "clarks outlet",
-    "fatface",
-    "poundland",
-    "frosts",
-    "photobox",
-    "the entertainer",
-    "next retail",
-    "hobbycraft",
-    "babysensory",
-    "amazon.co.uk",
-    "claybearofficial",
-    "argos",
-    "dobbies",
-    "sp close parent",
-    "nappy den",
-    "dunelm",
-    "littlelamb nappie",
-    "photobox",
-    "ikea",
-    "paypal",
-    "vinted",
-    "adidas",
-    "sumup",
-    "next online",
-    "the works",
-    "etsy.com",
-    "homesense",
-    "mixtiles",
-    "smyths toys",
-    "snappy snaps",
-    "bookshop",
-    "wh smith",
-    "wickes",
-    "post office",
-]
+def is_entertainment(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "entertainment")
+
+
+SHOPPING = KEYWORDS["shopping"]
 
 
 def category_shopping(row):
@@ -426,13 +615,11 @@ def category_shopping(row):
     return row
 
 
-PETCARE = [
-    "butternut box",
-    "butternut",
-    "lilys kitchen limited",
-    "pets at home",
-    "ifl pet insurance",
-]
+def is_shopping(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "shopping")
+
+
+PETCARE = KEYWORDS["petcare"]
 
 
 def category_petcare(row):
@@ -446,19 +633,11 @@ def category_petcare(row):
     return row
 
 
-HEALTHCARE = [
-    "smiles centre swindon",
-    "moveology",
-    "david lloyd leisur",
-    "vitabiotics",
-    "jessicas hair",
-    "boots",
-    "pharmacy",
-    "smilescentre",
-    "david lloyd",
-    "great western hospital swindon",
-    "great western h",
-]
+def is_petcare(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "petcare")
+
+
+HEALTHCARE = KEYWORDS["healthcare"]
 
 
 def category_healthcare(row):
@@ -472,7 +651,11 @@ def category_healthcare(row):
     return row
 
 
-SAVINGS = ["winterflood"]
+def is_healthcare(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "healthcare")
+
+
+SAVINGS = KEYWORDS["savings"]
 
 
 def category_savings(row):
@@ -486,6 +669,13 @@ def category_savings(row):
     return row
 
 
+def is_savings(df: pd.DataFrame) -> pd.Series:
+    return keyword_matcher.matches(df[DESCRIPTION], "savings")
+
+
+# one automaton over every keyword list, each description is scanned once
+keyword_matcher = KeywordMatcher(KEYWORDS)
+
 categorizer = TransactionCategorizer()
 categorizer.register(category_salary)
 categorizer.register(category_interest_income)
@@ -504,3 +694,22 @@ categorizer.register(category_healthcare)
 categorizer.register(category_petcare)
 categorizer.register(category_savings)
 categorizer.register(category_entertainment)
+
+categorizer.register_rule("salary", is_salary)
+categorizer.register_rule("interest", is_interest_income)
+categorizer.register_rule(ACCOUNT_TRANSFER, is_own_account_transfer)
+categorizer.register_rule("faster_payments_receipt", is_faster_payments_receipt)
+categorizer.register_rule("utilities", is_utilities)
+categorizer.register_rule("childcare", is_childcare)
+categorizer.register_rule("home services", is_home_services)
+categorizer.register_rule("groceries", is_groceries)
+categorizer.register_rule("eating out", is_eating_out)
+categorizer.register_rule("housing", is_housing)
+categorizer.register_rule("debt", is_debt)
+categorizer.register_rule("transport", is_transport)
+categorizer.register_rule("travel", is_travel)
+categorizer.register_rule("shopping", is_shopping)
+categorizer.register_rule("healthcare", is_healthcare)
+categorizer.register_rule("petcare", is_petcare)
+categorizer.register_rule("savings", is_savings)
+categorizer.register_rule("entertainment", is_entertainment)
@@ -4,6 +4,7 @@ from loguru import logger
 from typing import List
 import math
 
+import numpy as np
 import pandas as pd
 
 DATE_STR_FORMAT = "%d%m%Y"
@@ -11,6 +12,11 @@ OUTPUT_DATE_STR_FORMAT = "%d %B %Y"
 INPUT_DATE_STR_FORMAT = "%d/%m/%Y"
 
 from enrich.mappings import DESCRIPTION, CODE, COUNTERPARTY, EMPLOYERS, CREDITOR_NAME
+from enrich.memo import DistinctKeyCache
+
+# columns the counterparty of a transaction depends on
+MEMO_COLUMNS = ["account_type", CODE, DESCRIPTION, CREDITOR_NAME, COUNTERPARTY]
+counterparty_cache = DistinctKeyCache()
 
 
 def postprocess_counterparty(counterparty: str) -> str:
@@ -292,22 +298,123 @@ def clean_counterparty(counterparty: str):
         )
 
 
-def add_counterparties(df: pd.DataFrame):
-    # process current account
-    df.loc[df.account_type == "CACC", "counterparty"] = (
-        df.loc[df.account_type == "CACC"]
-        .apply(get_counterparty, **{"account_type": "CACC"}, axis=1)
-        .fillna("unknown")
+# precompiled patterns of the set_* functions, for vectorized extraction
+CREDIT_COUNTERPARTY_PATTERN = re.compile(r"(?:from|ref.)\s+(.*?)\s+(?:reference|ref)")
+FROM_PATTERN = re.compile(r"from\s+(.+)")
+GIRO_CREDIT_PATTERN = re.compile(r"ref\s(.*),")
+DEBIT_COUNTERPARTY_PATTERN = re.compile(r"to\s+(.*?)\s+(?:reference|on|,|ref)")
+TRANSFER_TO_PATTERN = re.compile(r"transfer to\s(.*)")
+RECURRENT_TRANSACTION_PATTERN = re.compile(r"\bat\s+(.*?)\sof\b")
+
+
+def extract(descriptions: pd.Series, pattern: re.Pattern) -> pd.Series:
+    """First capture group of the first match of pattern, NaN if no match."""
+    return descriptions.str.extract(pattern, expand=True)[0]
+
+
+def extract_credit_counterparty_fasterpayments(descriptions: pd.Series) -> pd.Series:
+    counterparties = extract(descriptions, CREDIT_COUNTERPARTY_PATTERN)
+    return counterparties.fillna(extract(descriptions, FROM_PATTERN))
+
+
+def extract_debit_cacc_recurrent_transaction(descriptions: pd.Series) -> pd.Series:
+    # last 3 chars are country code, clean
+    return extract(descriptions, RECURRENT_TRANSACTION_PATTERN).str[:-3]
+
+
+def extract_bank_transfer_debit(descriptions: pd.Series) -> pd.Series:
+    counterparties = extract(descriptions, DEBIT_COUNTERPARTY_PATTERN)
+    is_transfer = descriptions.str.contains("transfer to", regex=False, na=False)
+    counterparties = counterparties.where(
+        ~is_transfer, extract(descriptions, TRANSFER_TO_PATTERN)
+    )
+    return counterparties.where(
+        descriptions != "credit card payment", "Matthew Stewart"
     )
 
+
+# vectorized equivalent of the counterparty_mapping of get_counterparty
+CACC_FIXED_COUNTERPARTIES = {
+    "CASHBACK": "santander",
+    "CREDIT INTEREST": "santander",
+    "DEBIT CARD CASH WITHDRAWAL": "cash withdrawal",
+    "CHEQUE DEPOSIT": "cheque unknown",
+    "ACCOUNT CANCELLATION CREDIT": "account closure transfer",
+}
+CACC_EXTRACTORS = {
+    "FASTER PAYMENT RECEIPT": extract_credit_counterparty_fasterpayments,
+    "PURCHASE - DOMESTIC": extract_debit_cacc_recurrent_transaction,
+    "RECURRENT TRANSACTION": extract_debit_cacc_recurrent_transaction,
+    "APPLE PAY IN-APP": extract_debit_cacc_recurrent_transaction,
+    "BANK TRANSFER CREDIT": lambda x: extract(x, GIRO_CREDIT_PATTERN),
+    "EXTERNAL DIRECT DEBIT": lambda x: extract(x, DEBIT_COUNTERPARTY_PATTERN),
+    "OTT DEBIT": lambda x: extract(x, DEBIT_COUNTERPARTY_PATTERN),
+    "OTT CREDIT": lambda x: extract(x, CREDIT_COUNTERPARTY_PATTERN),
+    "BANK TRANSFER DEBIT": extract_bank_transfer_debit,
+}
+
+
+def get_cacc_counterparties(df: pd.DataFrame) -> pd.Series:
+    """Vectorized get_counterparty for CACC rows, one extraction per code."""
+    counterparties = np.full(len(df), None, dtype=object)
+    groups = df.groupby(CODE, sort=False, dropna=False).indices
+    for payment_type, positions in groups.items():
+        if payment_type in CACC_FIXED_COUNTERPARTIES:
+            counterparties[positions] = CACC_FIXED_COUNTERPARTIES[payment_type]
+        elif payment_type in CACC_EXTRACTORS:
+            # extract once per distinct description
+            codes, descriptions = pd.factorize(
+                df[DESCRIPTION].iloc[positions], use_na_sentinel=False
+            )
+            extracted = CACC_EXTRACTORS[payment_type](
+                pd.Series(descriptions, dtype=object)
+            )
+            counterparties[positions] = extracted.to_numpy(dtype=object)[codes]
+        else:
+            logger.warning(
+                f"unknown proprietaryBankTransactionCode: {payment_type} "
+                f"({len(positions)} transactions)"
+            )
+            counterparties[positions] = "unknown"
+    return pd.Series(counterparties, index=df.index).fillna("unknown")
+
+
+def get_card_counterparties(df: pd.DataFrame) -> pd.Series:
+    """Vectorized get_counterparty for CARD rows."""
+    creditor_names = df[CREDITOR_NAME]
+    invalid = creditor_names.notna() & ~creditor_names.map(lambda x: isinstance(x, str))
+    if invalid.any():
+        creditor_name = creditor_names[invalid].iloc[0]
+        raise TypeError(f"{creditor_name}, type {type(creditor_name)}")
+    return creditor_names.astype(object).str.lower().fillna("unknown")
+
+
+def add_counterparties(df: pd.DataFrame, memoize: bool = False):
+    if memoize:
+        # extract once per distinct key, reusing results from counterparty_cache
+        key_columns = [column for column in MEMO_COLUMNS if column in df.columns]
+        df["counterparty"] = counterparty_cache.apply(
+            df,
+            key_columns,
+            lambda rows: add_counterparties(rows.copy())["counterparty"],
+        )
+        return df
+
     # process current account
-    df.loc[df.account_type == "CARD", "counterparty"] = (
-        df.loc[df.account_type == "CARD"]
-        .apply(get_counterparty, **{"account_type": "CARD"}, axis=1)
-        .fillna("unknown")
+    is_current_account = df.account_type == "CACC"
+    df.loc[is_current_account, "counterparty"] = get_cacc_counterparties(
+        df.loc[is_current_account]
+    )
+
+    # process credit card
+    is_credit_card = df.account_type == "CARD"
+    df.loc[is_credit_card, "counterparty"] = get_card_counterparties(
+        df.loc[is_credit_card]
     )
 
-    # counterparty info
-    df["counterparty"] = df["counterparty"].apply(clean_counterparty)
+    # counterparty info, cleaned once per distinct counterparty
+    codes, counterparties = pd.factorize(df["counterparty"], use_na_sentinel=False)
+    cleaned = np.array([clean_counterparty(c) for c in counterparties], dtype=object)
+    df["counterparty"] = cleaned[codes]
 
     return df
@@ -0,0 +1,111 @@
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over several named keyword lists.
+
+    A text is scanned once, whatever the number of lists and keywords, and the
+    result records every list with at least one keyword found in the text
+    (substring match, as `any(keyword in text for keyword in keywords)`).
+
+    Args:
+        keyword_lists (dict[str, list[str]]): Keyword lists by name.
+        cache_size (int): Number of distinct texts whose scan result is kept.
+    """
+
+    def __init__(self, keyword_lists: dict[str, list[str]], cache_size: int = 2**16):
+        self.keyword_lists = keyword_lists
+        self.bits = {name: 1 << i for i, name in enumerate(keyword_lists)}
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[int] = [0]
+        self._build()
+        self.cache_size = cache_size
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def __getstate__(self):
+        # the scan cache wraps a bound method and is rebuilt on unpickling
+        state = self.__dict__.copy()
+        del state["scan"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.scan = lru_cache(maxsize=self.cache_size)(self._scan)
+
+    def _add_keyword(self, keyword: str, bit: int):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(0)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] |= bit
+
+    def _build(self):
+        for name, keywords in self.keyword_lists.items():
+            for keyword in keywords:
+                self._add_keyword(keyword, self.bits[name])
+
+        # breadth first, so the fail state of a node is always resolved
+        # before its children are visited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def _scan(self, text: str) -> int:
+        """Bitmask of the keyword lists matched by text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        matched = output[0]
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            matched |= output[state]
+        return matched
+
+    def matched_lists(self, text: str) -> list[str]:
+        """Names of every keyword list with a keyword in text."""
+        matched = self.scan(text)
+        return [name for name, bit in self.bits.items() if matched & bit]
+
+    def matches(self, series: pd.Series, name: str) -> pd.Series:
+        """
+        Vectorized `any(keyword in value for keyword in keyword_lists[name])`.
+
+        Each distinct value is scanned once, missing values never match.
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+
+        bit = self.bits[name]
+        hits = np.fromiter(
+            (
+                isinstance(value, str) and bool(self.scan(value) & bit)
+                for value in uniques
+            ),
+            dtype=bool,
+            count=len(uniques),
+        )
+        # codes of -1 mark missing values
+        is_match = np.append(hits, False)[codes]
+        return pd.Series(is_match, index=series.index)
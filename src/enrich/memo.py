@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_MISSING = object()
+
+
+class DistinctKeyCache:
+    """
+    Bounded LRU cache of enrichment results by distinct key.
+
+    Transactions repeat a small set of (description, code, counterparty) keys,
+    so enrichment only needs to run once per distinct key. The cache lives as
+    long as the process, so repeated pipeline runs only pay for new keys.
+
+    Args:
+        maxsize (int): Maximum number of cached keys, least recently used
+            keys are evicted first.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        self._results.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._results),
+            "maxsize": self.maxsize,
+        }
+
+    def _get(self, key):
+        result = self._results.get(key, _MISSING)
+        if result is not _MISSING:
+            self._results.move_to_end(key)
+        return result
+
+    def _put(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def apply(self, df: pd.DataFrame, key_columns: list[str], func) -> pd.Series:
+        """
+        Evaluate func once per distinct key and scatter the results to every row.
+
+        Args:
+            df (pd.DataFrame): Rows to evaluate.
+            key_columns (list[str]): Columns func depends on.
+            func (Callable[[pd.DataFrame], pd.Series]): Row-aligned results for
+                a DataFrame of distinct rows.
+
+        Returns:
+            pd.Series: Results aligned with df.index.
+        """
+        if df.empty:
+            return pd.Series(index=df.index, dtype=object)
+
+        keys = df[key_columns]
+        # group numbers follow first appearance, as do the rows kept by duplicated
+        codes = keys.groupby(key_columns, dropna=False, sort=False).ngroup()
+        unique_rows = df.loc[~keys.duplicated()]
+        unique_keys = [
+            tuple(None if pd.isna(value) else value for value in key)
+            for key in unique_rows[key_columns].itertuples(index=False, name=None)
+        ]
+
+        results = [self._get(key) for key in unique_keys]
+        missing = [i for i, result in enumerate(results) if result is _MISSING]
+        self.hits += len(unique_keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            computed = func(unique_rows.iloc[missing]).to_numpy()
+            for i, result in zip(missing, computed):
+                results[i] = result
+                self._put(unique_keys[i], result)
+
+        values = np.empty(len(results), dtype=object)
+        values[:] = results
+        return pd.Series(values[codes.to_numpy()], index=df.index)
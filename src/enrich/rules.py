@@ -0,0 +1,252 @@
+"""
+Categorization rules loaded from a YAML or JSON rule file.
+
+A rule file has a list of `rules`, evaluated in order, and named `keywords`
+lists shared by the rules (see enrich/rules.yaml). Each rule has a `category`
+and a predicate:
+
+    {"column": ..., "equals": ...}
+    {"column": ..., "contains": ..., "case": false}
+    {"column": ..., "keywords": <name of a keywords list>}
+    {"all": [<predicate>, ...]}, {"any": [<predicate>, ...]}, {"not": <predicate>}
+
+The keyword lists are compiled into one KeywordMatcher. Compiled rule sets are
+pickled to a cache directory keyed by the sha256 of the rule file and
+RULE_SET_FORMAT, so a rule file is only compiled once whatever the number of
+processes loading it.
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+from dataclasses import dataclass
+from functools import reduce
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+import yaml
+from loguru import logger
+
+from enrich.categories import RULES_PATH, TransactionCategorizer, contains
+from enrich.keywords import KeywordMatcher
+import utils
+
+RULES_CACHE_DIR = Path("../data/cache/rules")
+# bump when RuleSet or KeywordMatcher change, so older pickles are not loaded
+RULE_SET_FORMAT = 1
+
+
+@dataclass
+class RuleSet:
+    version: str
+    rules: list[dict]
+    keyword_matcher: KeywordMatcher
+
+    def _compile_predicate(self, spec: dict):
+        if "all" in spec:
+            predicates = [self._compile_predicate(s) for s in spec["all"]]
+            return lambda df: reduce(lambda a, b: a & b, (p(df) for p in predicates))
+
+        if "any" in spec:
+            predicates = [self._compile_predicate(s) for s in spec["any"]]
+            return lambda df: reduce(lambda a, b: a | b, (p(df) for p in predicates))
+
+        if "not" in spec:
+            predicate = self._compile_predicate(spec["not"])
+            return lambda df: ~predicate(df)
+
+        column = spec.get("column")
+        if column is None:
+            raise ValueError(f"invalid rule predicate: {spec}")
+
+        if "equals" in spec:
+            value = spec["equals"]
+            return lambda df: df[column] == value
+
+        if "contains" in spec:
+            text, case = spec["contains"], spec.get("case", True)
+            return lambda df: contains(df[column], text, case=case)
+
+        if "keywords" in spec:
+            name = spec["keywords"]
+            if name not in self.keyword_matcher.bits:
+                raise ValueError(f"unknown keywords list: {name}")
+            return lambda df: self.keyword_matcher.matches(df[column], name)
+
+        raise ValueError(f"invalid rule predicate: {spec}")
+
+    def columns(self) -> list[str]:
+        """Columns read by the rules, in order of first use."""
+        columns = {}
+
+        def visit(spec: dict):
+            for predicates in (spec.get("all", []), spec.get("any", [])):
+                for predicate in predicates:
+                    visit(predicate)
+            if "not" in spec:
+                visit(spec["not"])
+            if "column" in spec:
+                columns[spec["column"]] = None
+
+        for rule in self.rules:
+            visit(rule)
+        return list(columns)
+
+    def compile(self) -> list[tuple[str, Callable]]:
+        """Rules as (category, condition) pairs for TransactionCategorizer."""
+        compiled_rules = []
+        for rule in self.rules:
+            predicate = {key: value for key, value in rule.items() if key != "category"}
+            compiled_rules.append(
+                (rule["category"], self._compile_predicate(predicate))
+            )
+        return compiled_rules
+
+
+def parse_rule_file(content: bytes, suffix: str) -> dict:
+    if suffix == ".json":
+        data = json.loads(content)
+    else:
+        data = yaml.safe_load(content)
+
+    if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+        raise ValueError("rule file must have a list of rules")
+    for rule in data["rules"]:
+        if "category" not in rule:
+            raise ValueError(f"rule without category: {rule}")
+    return data
+
+
+def _save_rule_set(rule_set: RuleSet, cache_path: Path):
+    with utils.atomic_write(cache_path, "wb") as file:
+        pickle.dump(rule_set, file)
+
+
+def load_rule_set(rules_path: Path = RULES_PATH, cache_dir: Path = RULES_CACHE_DIR):
+    """
+    Load a compiled rule set, from the cache if this rule file was seen before.
+
+    Args:
+        rules_path (Path): YAML or JSON rule file.
+        cache_dir (Path): Directory of compiled rule sets, None to disable.
+
+    Returns:
+        RuleSet: The rule set, versioned by the sha256 of the rule file.
+    """
+    rules_path = Path(rules_path)
+    content = rules_path.read_bytes()
+    version = hashlib.sha256(content).hexdigest()
+
+    cache_name = f"v{RULE_SET_FORMAT}-{version}.pkl"
+    cache_path = Path(cache_dir) / cache_name if cache_dir else None
+    if cache_path and cache_path.is_file():
+        logger.debug(f"loading compiled rules {version[:12]} from cache")
+        try:
+            with open(cache_path, "rb") as file:
+                return pickle.load(file)
+        except Exception as e:
+            logger.warning(f"ignoring unreadable {cache_path}: {e}")
+
+    logger.info(f"compiling rules from {rules_path}")
+    data = parse_rule_file(content, rules_path.suffix)
+    rule_set = RuleSet(
+        version=version,
+        rules=data["rules"],
+        keyword_matcher=KeywordMatcher(data.get("keywords", {})),
+    )
+    # fail on invalid predicates before caching
+    rule_set.compile()
+    if cache_path:
+        _save_rule_set(rule_set, cache_path)
+    return rule_set
+
+
+class RuleFileCategorizer(TransactionCategorizer):
+    """
+    TransactionCategorizer whose rules come from a rule file.
+
+    The file is checked on each call to categorize_transactions and, when its
+    content changed, recompiled and swapped in, so a long-running process picks
+    up rule changes without a restart. If the new file is invalid the current
+    rules are kept.
+    """
+
+    def __init__(
+        self, rules_path: Path = RULES_PATH, cache_dir: Path = RULES_CACHE_DIR
+    ):
+        super().__init__()
+        self.rules_path = Path(rules_path)
+        self.cache_dir = cache_dir
+        self.version = None
+        self.rule_set = None
+        self._file_stamp = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Swap in the rules of the rule file if it changed.
+
+        Returns:
+            bool: True if new rules were swapped in.
+        """
+        stat = self.rules_path.stat()
+        file_stamp = (stat.st_mtime_ns, stat.st_size)
+        if file_stamp == self._file_stamp:
+            return False
+
+        with self._lock:
+            if file_stamp == self._file_stamp:
+                return False
+            try:
+                rule_set = load_rule_set(self.rules_path, self.cache_dir)
+            except Exception as e:
+                if self.version is None:
+                    raise e
+                logger.error(f"failed to reload {self.rules_path}, keeping rules: {e}")
+                return False
+            finally:
+                self._file_stamp = file_stamp
+
+            if rule_set.version == self.version:
+                return False
+
+            # a single assignment, concurrent callers see the old or new rules
+            self.category_rules = rule_set.compile()
+            self.rule_set = rule_set
+            # categories are memoized by every column a rule reads
+            self.memo_columns = rule_set.columns()
+            self.category_cache.clear()
+            self.version = rule_set.version
+            logger.info(f"loaded categorization rules {self.version[:12]}")
+            return True
+
+    def rules_version(self) -> str:
+        self.reload()
+        return self.version
+
+    def categorize_transactions(
+        self, df, vectorized: bool = True, memoize: bool = False
+    ) -> pd.DataFrame:
+        self.reload()
+        return super().categorize_transactions(
+            df, vectorized=vectorized, memoize=memoize
+        )
+
+    def categorize_transactions_parallel(self, df, **kwargs) -> pd.DataFrame:
+        self.reload()
+        return super().categorize_transactions_parallel(df, **kwargs)
+
+    def __getstate__(self):
+        # compiled rules are closures, workers rebuild them from the rule set
+        state = super().__getstate__()
+        del state["category_rules"]
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self.category_rules = self.rule_set.compile()
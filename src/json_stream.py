@@ -0,0 +1,123 @@
+"""
+Incremental reading of large JSON files.
+
+JsonStream walks the containers of a document one member at a time, decoding
+only the values asked for, so memory is bounded by the largest value decoded
+rather than by the file:
+
+    with open(path) as file:
+        stream = JsonStream(file)
+        for key in stream.keys():          # members of the top-level object
+            for element in stream.elements(): # elements of an array member
+                item = stream.value()
+"""
+
+import json
+import re
+from typing import Iterator, TextIO
+
+WHITESPACE = " \t\n\r"
+# what may follow the part of a number read so far, up to the end of the buffer
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+
+class JsonStream:
+    """
+    Pull parser over a text file of JSON.
+
+    Containers are walked with keys and elements, which position the stream
+    on each member value in turn. The caller consumes each member value, with
+    value, keys, elements or skip, before asking for the next one.
+
+    Args:
+        file (TextIO): File opened in text mode.
+        chunk_size (int): Number of characters read at a time.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = 2**16):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read more of the file, dropping what was consumed. False at EOF."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.position :]
+        self.position = 0
+        # read at least as much as is buffered, so decoding a large value
+        # is retried a logarithmic number of times
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, "" at the end of the file."""
+        while True:
+            while self.position < len(self.buffer):
+                if self.buffer[self.position] not in WHITESPACE:
+                    return self.buffer[self.position]
+                self.position += 1
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(
+                f"expected {char!r} in JSON, found {self.peek()!r} at {self.position}"
+            )
+        self.position += 1
+
+    def value(self):
+        """Decode the next value in full."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the file, and
+            # raw_decode takes 12 of 12.50 or 1.5 of 1.5e10 for a whole number
+            if (
+                isinstance(value, (int, float))
+                and NUMBER_TAIL.match(self.buffer, end)
+                and self._fill()
+            ):
+                continue
+            self.position = end
+            return value
+
+    def skip(self):
+        """Skip the next value."""
+        self.value()
+
+    def _members(self, open_char: str, close_char: str) -> Iterator[None]:
+        self._expect(open_char)
+        if self.peek() == close_char:
+            self.position += 1
+            return
+        while True:
+            yield
+            if self.peek() == close_char:
+                self.position += 1
+                return
+            self._expect(",")
+
+    def keys(self) -> Iterator[str]:
+        """Keys of the next object, positioned on each value in turn."""
+        for _ in self._members("{", "}"):
+            key = self.value()
+            self._expect(":")
+            yield key
+
+    def elements(self) -> Iterator[None]:
+        """Elements of the next array, positioned on each element in turn."""
+        return self._members("[", "]")
@@ -1,14 +1,19 @@
 from dataclasses import dataclass
+from functools import lru_cache
 import dataclasses
 import datetime
 from enum import Enum
-from copy import copy, deepcopy
 from collections import OrderedDict
+from operator import attrgetter
+from typing import Iterator
 from dotenv import load_dotenv
 
 from numpy import isin
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel, Field
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from pydantic.alias_generators import to_camel
 
 load_dotenv("user.env")
 
@@ -18,8 +23,65 @@ class TransactionType:
     pending_transaction = "pending"
 
 
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _parse_date(value: str, date_format: str) -> datetime.date:
+    # fromisoformat is faster, but also takes e.g. 20240102 or 2024-W01-2
+    if date_format == DATE_FORMAT and len(value) == 10 and value[4] == value[7] == "-":
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.datetime.strptime(value, date_format).date()
+
+
+@lru_cache(maxsize=2**12, typed=True)
+def _format_date(value: datetime.date, date_format: str) -> str:
+    # transactions share a few hundred dates, strftime once per date
+    return value.strftime(date_format)
+
+
+class _LazyDate:
+    """
+    Date field of a slotted dataclass, parsed from str on first read.
+
+    Wraps the slot of the field: the raw value is stored as is and replaced by
+    the parsed date the first time it is read, so a malformed date raises
+    ValueError on that read rather than when the Transaction is created.
+    """
+
+    def __init__(self, slot, date_format: str):
+        self.slot = slot
+        self.date_format = date_format
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self.slot.__get__(instance, owner)
+        if isinstance(value, str):
+            value = _parse_date(value, self.date_format)
+            self.slot.__set__(instance, value)
+        return value
+
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, value)
+
+    @staticmethod
+    def format(value, date_format: str) -> str:
+        """A raw value as Transaction.to_dict formats it."""
+        if isinstance(value, str):
+            value = _parse_date(value, date_format)
+        return _format_date(value, date_format)
+
+    def raw(self, instance):
+        """The stored value, without parsing it."""
+        return self.slot.__get__(instance, type(instance))
+
+
 # Transaction class
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     # from api
     booking_date: str = None
@@ -65,31 +127,8 @@ class Transaction:
         if self.exchange_rate:
             self.exchange_rate = float(self.exchange_rate)
 
-        # convert str to datetime, if not None
-        if isinstance(self.booking_date, str):
-            self.booking_date = datetime.datetime.strptime(
-                self.booking_date, "%Y-%m-%d"
-            ).date()
-        if isinstance(self.value_date, str):
-            self.value_date = datetime.datetime.strptime(
-                self.value_date, "%Y-%m-%d"
-            ).date()
-
-        if isinstance(self.value_date_time, str):
-            self.value_date_time = datetime.datetime.strptime(
-                self.value_date_time, "%Y-%m-%dT%H:%M:%SZ"
-            ).date()
-        if isinstance(self.booking_date_time, str):
-            self.booking_date_time = datetime.datetime.strptime(
-                self.booking_date_time, "%Y-%m-%dT%H:%M:%SZ"
-            ).date()
-
-        if isinstance(self.quotation_date, str):
-            self.quotation_date = datetime.datetime.strptime(
-                self.quotation_date, "%Y-%m-%dT%H:%M:%SZ"
-            ).date()
-
     def __post_init__(self):
+        # dates are parsed from str when first read, see _LazyDate
         self.enforce_types()
 
     @classmethod
@@ -98,33 +137,144 @@ class Transaction:
 
     # return as dict
     def to_dict(self):
+        data = dict(zip(TRANSACTION_FIELDS, _transaction_values(self)))
+        # str to float
+        for field in TRANSACTION_FLOAT_FIELDS:
+            if data[field]:
+                data[field] = float(data[field])
         # datetime to str
+        for field, date_format in TRANSACTION_DATE_FIELDS.items():
+            if data[field]:
+                data[field] = _format_date(data[field], date_format)
+        return data
 
-        copy_class = copy(self)
-        copy_class.enforce_types()
 
-        if copy_class.booking_date:
-            copy_class.booking_date = copy_class.booking_date.strftime("%Y-%m-%d")
-        if copy_class.value_date:
-            copy_class.value_date = copy_class.value_date.strftime("%Y-%m-%d")
-        if copy_class.quotation_date:
-            copy_class.quotation_date = copy_class.quotation_date.strftime(
-                "%Y-%m-%dT%H:%M:%SZ"
-            )
-            # copy_class.quotation_date = datetime.strptime(
-            #     copy_class.quotation_date, "%Y-%m-%dT%H:%M:%SZ"
-            # ).date()
-        if copy_class.value_date_time:
-            copy_class.value_date_time = copy_class.value_date_time.strftime(
-                "%Y-%m-%dT%H:%M:%SZ"
-            )
-        if copy_class.booking_date_time:
-            copy_class.booking_date_time = copy_class.booking_date_time.strftime(
-                "%Y-%m-%dT%H:%M:%SZ"
-            )
+TRANSACTION_FIELDS = [field.name for field in dataclasses.fields(Transaction)]
+TRANSACTION_FLOAT_FIELDS = ["amount", "instructed_amount", "exchange_rate"]
+# parsed to dates when first read
+TRANSACTION_DATE_FIELDS = {
+    "booking_date": DATE_FORMAT,
+    "value_date": DATE_FORMAT,
+    "booking_date_time": DATETIME_FORMAT,
+    "value_date_time": DATETIME_FORMAT,
+    "quotation_date": DATETIME_FORMAT,
+}
+for field, date_format in TRANSACTION_DATE_FIELDS.items():
+    setattr(Transaction, field, _LazyDate(getattr(Transaction, field), date_format))
+_transaction_values = attrgetter(*TRANSACTION_FIELDS)
+
 
-        # remove None values
-        return copy(copy_class.__dict__)
+def conform_transactions_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnar Transaction(**d) for a DataFrame of transactions.
+
+    Missing fields are added, fields are put in Transaction order, amounts are
+    parsed to floats and dates to datetime64 (midnight, as enforce_types drops
+    the time of day).
+
+    Raises:
+        TypeError: If df has columns that are not Transaction fields.
+    """
+    unexpected = [column for column in df.columns if column not in TRANSACTION_FIELDS]
+    if unexpected:
+        raise TypeError(f"unexpected Transaction fields: {unexpected}")
+
+    df = df.copy()
+    for field in TRANSACTION_FIELDS:
+        if field not in df.columns:
+            # object columns of None, like a field missing from every Transaction
+            df[field] = pd.Series(None, index=df.index, dtype=object)
+    df = df[TRANSACTION_FIELDS]
+    for field in TRANSACTION_FLOAT_FIELDS:
+        df[field] = pd.to_numeric(df[field])
+    for field, date_format in TRANSACTION_DATE_FIELDS.items():
+        # strings are parsed with date_format, dates and timestamps kept
+        df[field] = pd.to_datetime(df[field], format=date_format).dt.normalize()
+    return df
+
+
+def transactions_to_dataframe(transactions: list[Transaction]) -> pd.DataFrame:
+    """Transactions as a DataFrame with a column per Transaction field."""
+    if not transactions:
+        return pd.DataFrame(columns=TRANSACTION_FIELDS)
+    # raw values rather than pd.DataFrame(transactions), which deep copies each
+    # one, and dates unparsed, conform parses them in one pass
+    getters = [
+        (
+            getattr(Transaction, field).raw
+            if field in TRANSACTION_DATE_FIELDS
+            else attrgetter(field)
+        )
+        for field in TRANSACTION_FIELDS
+    ]
+    records = [
+        [getter(transaction) for getter in getters] for transaction in transactions
+    ]
+    return conform_transactions_dataframe(
+        pd.DataFrame(records, columns=TRANSACTION_FIELDS)
+    )
+
+
+def transactions_from_dataframe(df: pd.DataFrame) -> list[Transaction]:
+    """Materialize the rows of a transactions DataFrame, missing values as None."""
+    df = df.astype(object).where(df.notna(), None)
+    return [Transaction(**d) for d in df.to_dict(orient="records")]
+
+
+def _record_column(df: pd.DataFrame, field: str) -> np.ndarray:
+    """Values of Transaction(**d).to_dict()[field] for the rows of df."""
+    if field not in df.columns:
+        return np.full(len(df), None, dtype=object)
+
+    column = df[field]
+    date_format = TRANSACTION_DATE_FIELDS.get(field)
+    if date_format and pd.api.types.is_datetime64_any_dtype(column):
+        column = column.dt.strftime(date_format)
+        date_format = None
+    values = column.astype(object).where(column.notna(), None).to_numpy()
+
+    # dates and amounts that are not already datetime64 and float columns
+    if date_format:
+        values = [
+            _LazyDate.format(value, date_format) if value else value for value in values
+        ]
+    elif field in TRANSACTION_FLOAT_FIELDS and not pd.api.types.is_float_dtype(column):
+        values = [float(value) if value else value for value in values]
+    return np.array(values, dtype=object)
+
+
+def iter_transaction_records(
+    transactions: list[Transaction] | pd.DataFrame, chunk_size: int = 10_000
+) -> Iterator[list[dict]]:
+    """
+    Transaction.to_dict() records of transactions, in chunks.
+
+    For a DataFrame the records are those of transactions_from_dataframe(df),
+    built column-wise without materializing Transactions: dates are formatted
+    in one pass per column.
+
+    Args:
+        transactions (list[Transaction] | pd.DataFrame): Transactions.
+        chunk_size (int): Number of records per chunk.
+
+    Raises:
+        TypeError: If a DataFrame has columns that are not Transaction fields.
+    """
+    if not isinstance(transactions, pd.DataFrame):
+        for start in range(0, len(transactions), chunk_size):
+            chunk = transactions[start : start + chunk_size]
+            yield [transaction.to_dict() for transaction in chunk]
+        return
+
+    df = transactions
+    unexpected = [column for column in df.columns if column not in TRANSACTION_FIELDS]
+    if unexpected:
+        raise TypeError(f"unexpected Transaction fields: {unexpected}")
+
+    columns = [_record_column(df, field) for field in TRANSACTION_FIELDS]
+    for start in range(0, len(df), chunk_size):
+        rows = zip(*(column[start : start + chunk_size].tolist() for column in columns))
+        yield [dict(zip(TRANSACTION_FIELDS, row)) for row in rows]
 
 
 class AccountMetadata(BaseModel):
@@ -186,6 +336,11 @@ def find_common_dicts(*lists):
     return result
 
 
+# models of Nordigen payloads validate the camelCase keys of the API as well
+# as their field names
+NORDIGEN_MODEL_CONFIG = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+
 class CurrentAccountDetails(BaseModel):
     """
     Model for current account details.
@@ -199,6 +354,8 @@ class CurrentAccountDetails(BaseModel):
         account_id (str): The account ID of the current account (key from nordigen: data).
     """
 
+    model_config = NORDIGEN_MODEL_CONFIG
+
     resource_id: str
     bban: str
     currency: str
@@ -218,6 +375,8 @@ class CreditCardDetails(BaseModel):
         details (str): The details of the credit card (key from nordigen: data)..
     """
 
+    model_config = NORDIGEN_MODEL_CONFIG
+
     resource_id: str
     currency: str
     masked_pan: str
@@ -292,11 +451,15 @@ class UserAccountDetails(BaseModel):
 
 
 class BalanceAmount(BaseModel):
+    model_config = NORDIGEN_MODEL_CONFIG
+
     amount: str
     currency: str
 
 
 class Balance(BaseModel):
+    model_config = NORDIGEN_MODEL_CONFIG
+
     balance_amount: BalanceAmount
     balance_type: str
     reference_date: str
@@ -315,11 +478,11 @@ class UserAccountBalances(BaseModel):
         self, account_id, balance: AccountBalances, account_name: str = None
     ):
         def preprocess(balance):
-            balance_to_set = deepcopy(balance)
-            balance_to_set.account_id = account_id
+            # a shallow copy, the balances are not modified
+            update = {"account_id": account_id}
             if account_name:
-                balance_to_set.account_name = account_name
-            return balance_to_set
+                update["account_name"] = account_name
+            return balance.model_copy(update=update)
 
         if not isinstance(balance, AccountBalances):
             raise TypeError("balances must be of type AccountBalances")
@@ -333,9 +496,9 @@ class UserAccountBalances(BaseModel):
         return self.balances.get(account_id, None)
 
     def to_dict(self, account_id):
-        data = deepcopy(
-            self.get_balances_by_account_id(account_id).model_dump().get("balances")
-        )
+        # model_dump returns new dicts, no need to copy them
+        balances = self.get_balances_by_account_id(account_id).model_dump()
+        data = list(balances.get("balances").values())
         for d in data:
             d["account_id"] = account_id
         return data
@@ -347,33 +510,308 @@ class UserAccountBalances(BaseModel):
         return None
 
 
+def _code_dtype(size: int) -> np.dtype:
+    # the smallest integer dtype for codes -1..size-1, as pandas categoricals use
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class TransactionView:
+    """
+    Read-only row of a TransactionTable, with the fields of a Transaction.
+
+    Values are decoded from the table on access; use to_transaction for a
+    Transaction to modify.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "TransactionTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getattr__(self, field):
+        if field not in TRANSACTION_FIELDS:
+            raise AttributeError(field)
+        return self._table.value(field, self._row)
+
+    def to_transaction(self) -> Transaction:
+        return Transaction(
+            **{
+                field: self._table.value(field, self._row)
+                for field in TRANSACTION_FIELDS
+            }
+        )
+
+    def to_dict(self) -> dict:
+        return self.to_transaction().to_dict()
+
+    def __eq__(self, other):
+        # as records, a table stores dates but Transactions may hold Timestamps
+        if isinstance(other, (Transaction, TransactionView)):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+    def __repr__(self):
+        return f"TransactionView({self.to_transaction()})"
+
+
+class TransactionTable:
+    """
+    Struct-of-arrays store of transactions.
+
+    Each Transaction field is a NumPy array: dates as datetime64 (NaT for
+    None), amounts as float64 (NaN for None) and every other field dictionary
+    encoded, as integer codes (-1 for None) into an array of distinct values.
+    Filters are vectorized, e.g. `table[table.mask("account_id", account_id)]`
+    or `table[table.columns["amount"] < 0]`, and rows are TransactionViews.
+
+    Build tables with from_transactions or from_dataframe.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], values: dict[str, np.ndarray]):
+        """
+        Args:
+            columns (dict[str, np.ndarray]): Array of each Transaction field, the
+                codes for dictionary encoded fields.
+            values (dict[str, np.ndarray]): Distinct values of each dictionary
+                encoded field.
+        """
+        self.columns = columns
+        self.values = values
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "TransactionTable":
+        """Table of a DataFrame of transactions, see conform_transactions_dataframe."""
+        df = conform_transactions_dataframe(df)
+        columns, values = {}, {}
+        for field in TRANSACTION_FIELDS:
+            if field in TRANSACTION_DATE_FIELDS:
+                columns[field] = df[field].to_numpy(dtype="datetime64[s]")
+            elif field in TRANSACTION_FLOAT_FIELDS:
+                columns[field] = df[field].to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                codes, uniques = pd.factorize(df[field])
+                columns[field] = codes.astype(_code_dtype(len(uniques)))
+                values[field] = np.asarray(uniques, dtype=object)
+        return cls(columns, values)
+
+    @classmethod
+    def from_transactions(cls, transactions: list[Transaction]) -> "TransactionTable":
+        return cls.from_dataframe(transactions_to_dataframe(transactions))
+
+    @classmethod
+    def concat(cls, tables: list["TransactionTable"]) -> "TransactionTable":
+        return cls.from_dataframe(
+            pd.concat([table.to_dataframe() for table in tables], ignore_index=True)
+        )
+
+    def __len__(self):
+        return len(self.columns[TRANSACTION_FIELDS[0]])
+
+    def __iter__(self) -> Iterator[TransactionView]:
+        return (TransactionView(self, row) for row in range(len(self)))
+
+    def __getitem__(self, key) -> "TransactionView | TransactionTable":
+        """A row for an integer, else a table of the rows selected by a slice,
+        a boolean mask or an array of positions."""
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("transaction index out of range")
+            return TransactionView(self, int(key))
+
+        if isinstance(key, slice):
+            columns = {field: column[key] for field, column in self.columns.items()}
+            return TransactionTable(columns, self.values)
+
+        positions = np.asarray(key)
+        if positions.dtype == bool:
+            # once, rather than a boolean index per column
+            positions = np.flatnonzero(positions)
+        columns = {
+            field: column.take(positions) for field, column in self.columns.items()
+        }
+        return TransactionTable(columns, self.values)
+
+    def value(self, field: str, row: int):
+        """The Transaction value of field in a row."""
+        value = self.columns[field][row]
+        if field in TRANSACTION_DATE_FIELDS:
+            return None if np.isnat(value) else value.astype("datetime64[D]").item()
+        if field in TRANSACTION_FLOAT_FIELDS:
+            return None if np.isnan(value) else float(value)
+        return None if value < 0 else self.values[field][value]
+
+    def mask(self, field: str, value) -> np.ndarray:
+        """Boolean mask of the rows whose field equals value."""
+        column = self.columns[field]
+        if field not in self.values:
+            return column == value
+        if value is None:
+            return column < 0
+        # compare codes, after finding the code of value among distinct values
+        codes = np.flatnonzero(self.values[field] == value)
+        if not len(codes):
+            return np.zeros(len(column), dtype=bool)
+        return column == codes[0]
+
+    def column(self, field: str) -> pd.Series:
+        """A field as a Series, categorical for dictionary encoded fields."""
+        column = self.columns[field]
+        if field in self.values:
+            column = pd.Categorical.from_codes(
+                column, categories=pd.Index(self.values[field]), validate=False
+            )
+        return pd.Series(column, name=field, copy=False)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        The table as a DataFrame, without copying its arrays.
+
+        Dictionary encoded fields become categoricals.
+        """
+        return pd.DataFrame(
+            {field: self.column(field) for field in TRANSACTION_FIELDS}, copy=False
+        )
+
+    def to_transactions(self) -> list[Transaction]:
+        return [view.to_transaction() for view in self]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays, not counting the distinct values themselves."""
+        return sum(column.nbytes for column in self.columns.values()) + sum(
+            values.nbytes for values in self.values.values()
+        )
+
 
 class UserData(BaseModel):
+    """
+    User data with indexed transactions.
+
+    Lookups by account, transaction code and booking date use indexes built on
+    first use. The indexes are rebuilt when transactions is reassigned or
+    changes length; call invalidate_indexes after modifying transactions in
+    place otherwise.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     requisition: Requisition
     account_metadata: UserAccountMetadata = None
     account_details: UserAccountDetails = None
     account_balances: UserAccountBalances = None
-    transactions: list[Transaction] = Field(default_factory=lambda: [])
-
-    def get_account_transactions(self, account_id: str) -> list[Transaction]:
-        return [
-            transaction
-            for transaction in self.transactions
-            if transaction.account_id == account_id
-        ]
+    # a TransactionTable for vectorized queries and compact storage
+    transactions: TransactionTable | list[Transaction] = Field(
+        default_factory=lambda: []
+    )
+    _indexes: dict = PrivateAttr(default_factory=dict)
+    _indexed_transactions: tuple = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "transactions":
+            self.invalidate_indexes()
+
+    def invalidate_indexes(self):
+        self._indexes = {}
+        self._indexed_transactions = None
+
+    def _index(self, name: str, build):
+        # identity and length of transactions catch reassignments and appends
+        indexed_transactions = (id(self.transactions), len(self.transactions))
+        if indexed_transactions != self._indexed_transactions:
+            self._indexes = {}
+            self._indexed_transactions = indexed_transactions
+
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = build()
+        return index
+
+    def _hash_index(self, field: str) -> dict[object, np.ndarray]:
+        """Positions of the transactions by value of field."""
+        transactions = self.transactions
+        if isinstance(transactions, TransactionTable):
+            codes = transactions.columns[field]
+            positions = pd.Series(codes).groupby(codes).indices
+            values = transactions.values[field]
+            return {
+                values[code] if code >= 0 else None: rows
+                for code, rows in positions.items()
+            }
+
+        positions = {}
+        for position, transaction in enumerate(transactions):
+            positions.setdefault(getattr(transaction, field), []).append(position)
+        return {value: np.array(rows) for value, rows in positions.items()}
+
+    def _booking_date_index(self) -> tuple[np.ndarray, np.ndarray]:
+        """Sorted booking dates and the positions of their transactions."""
+        transactions = self.transactions
+        if isinstance(transactions, TransactionTable):
+            dates = transactions.columns["booking_date"]
+        else:
+            dates = pd.to_datetime(
+                pd.Series([t.booking_date for t in transactions], dtype=object)
+            ).to_numpy()
+        dates = dates.astype("datetime64[D]")
+        # transactions without a booking date are left out
+        positions = np.flatnonzero(~np.isnat(dates))
+        positions = positions[np.argsort(dates[positions], kind="stable")]
+        return dates[positions], positions
+
+    def _take(self, positions: np.ndarray) -> list[Transaction] | TransactionTable:
+        if isinstance(self.transactions, TransactionTable):
+            return self.transactions[positions]
+        return [self.transactions[position] for position in positions]
+
+    def _lookup(self, field: str, value) -> list[Transaction] | TransactionTable:
+        index = self._index(field, lambda: self._hash_index(field))
+        return self._take(index.get(value, np.array([], dtype=int)))
+
+    def get_account_transactions(
+        self, account_id: str
+    ) -> list[Transaction] | TransactionTable:
+        return self._lookup("account_id", account_id)
 
     def query_transactions_by_transaction_code(
         self, proprietary_bank_transaction_code: str
-    ):
-        records = [
-            d
-            for d in self.transactions
-            if d.proprietary_bank_transaction_code == proprietary_bank_transaction_code
-        ]
-
-        print(f"Found {len(records)} records")
+    ) -> list[Transaction] | TransactionTable:
+        records = self._lookup(
+            "proprietary_bank_transaction_code", proprietary_bank_transaction_code
+        )
+        logger.debug(f"Found {len(records)} records")
         return records
 
+    def query_transactions_by_booking_date(
+        self, start: datetime.date = None, end: datetime.date = None
+    ) -> list[Transaction] | TransactionTable:
+        """
+        Transactions booked between start and end, inclusive, by booking date.
+
+        Args:
+            start (datetime.date): First booking date, None for no lower bound.
+            end (datetime.date): Last booking date, None for no upper bound.
+        """
+        dates, positions = self._index("booking_date", self._booking_date_index)
+        # binary searches of the sorted dates
+        low = (
+            0
+            if start is None
+            else np.searchsorted(dates, np.datetime64(start, "D"), side="left")
+        )
+        high = (
+            len(dates)
+            if end is None
+            else np.searchsorted(dates, np.datetime64(end, "D"), side="right")
+        )
+        return self._take(positions[low:high])
+
 
 class CurrentAccountBalanceTypes:
     interim_available = "interimAvailable"
@@ -1,10 +1,14 @@
+from collections import defaultdict
+import dataclasses
+from functools import lru_cache
+
 from loguru import logger
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from pydantic import BaseModel
 
-from enrich import clean, mappings, counterparty, categories
+from enrich import clean, mappings, counterparty, categories, rules
 import model
 import requisition
 import utils
@@ -13,7 +17,21 @@ SOURCE_HISTORIC = "historic"
 SOURCE_API = "api"
 BOOKING_DATE = "booking_date"
 SAVE_PATH = Path("../data/transactions.json")
+ENRICHMENT_STORE_PATH = Path("../data/enriched/enrichment_store.json")
+# bump when cleaning or enrichment changes, to re-enrich stored transactions
+ENRICHMENT_VERSION = 1
+# identify transactions without a transaction_id
+FINGERPRINT_FIELDS = [
+    "account_id",
+    "booking_date",
+    "amount",
+    "remittance_information_unstructured",
+    "proprietary_bank_transaction_code",
+    "internal_transaction_id",
+]
 HISTORIC_TRANSACTIONS_PATH = Path("../data/historic/df_transactions_raw.csv")
+# rule file transactions are categorised from, None for categories.categorizer
+CATEGORIZATION_RULES_PATH = rules.RULES_PATH
 
 
 def _time_data(df: pd.DataFrame) -> pd.DataFrame:
@@ -29,13 +47,33 @@ def _adjust_transaction_datetime(df: pd.DataFrame):
     return df
 
 
-def _enrich_transactions_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+@lru_cache
+def _rule_file_categorizer(rules_path: Path) -> rules.RuleFileCategorizer:
+    return rules.RuleFileCategorizer(rules_path)
+
+
+def get_categorizer() -> categories.TransactionCategorizer:
+    """
+    Categorizer of the pipeline: a RuleFileCategorizer of
+    CATEGORIZATION_RULES_PATH, shared by calls so the rule file is only reloaded
+    when it changes, or categories.categorizer if there is no rule file.
+    """
+    if CATEGORIZATION_RULES_PATH is None:
+        return categories.categorizer
+    return _rule_file_categorizer(Path(CATEGORIZATION_RULES_PATH))
+
+
+def _enrich_transactions_dataframe(
+    df: pd.DataFrame, categorizer: categories.TransactionCategorizer = None
+) -> pd.DataFrame:
     logger.info(f"Enriching dataframe")
+    categorizer = categorizer or get_categorizer()
+
     # counterparties
-    df = counterparty.add_counterparties(df)
+    df = counterparty.add_counterparties(df, memoize=True)
 
     # categorise
-    df = categories.categorizer.categorize_transactions(df)
+    df = categorizer.categorize_transactions(df, memoize=True)
 
     # process currency
     df["flow"] = df["amount"].apply(utils.get_flow)
@@ -46,9 +84,12 @@ def _enrich_transactions_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _enrich_transactions(transactions=list[model.Transaction]):
+def _enrich_transactions(
+    transactions=list[model.Transaction],
+    categorizer: categories.TransactionCategorizer = None,
+):
     df = pd.DataFrame(transactions)
-    enriched_df = _enrich_transactions_dataframe(df)
+    enriched_df = _enrich_transactions_dataframe(df, categorizer)
     enriched_transactions = [
         model.Transaction(**d) for d in enriched_df.to_dict(orient="records")
     ]
@@ -56,16 +97,150 @@ def _enrich_transactions(transactions=list[model.Transaction]):
     return enriched_transactions
 
 
-def enrich(transactions: list[model.Transaction]):
+def enrich(
+    transactions: list[model.Transaction],
+    categorizer: categories.TransactionCategorizer = None,
+):
     # clean transactions
     cleaned_transactions = clean.clean_transactions(transactions)
-    enriched_transactions = _enrich_transactions(cleaned_transactions)
+    enriched_transactions = _enrich_transactions(cleaned_transactions, categorizer)
     return enriched_transactions
 
 
-def save_transactions(cleaned_transactions: list[model.Transaction]):
-    data_to_save = [transaction.to_dict() for transaction in cleaned_transactions]
-    utils.save_data_to_json(data_to_save, SAVE_PATH)
+def enrich_dataframe(
+    df: pd.DataFrame, categorizer: categories.TransactionCategorizer = None
+) -> pd.DataFrame:
+    """
+    Columnar enrich: clean and enrich a transactions DataFrame in place of a
+    list of Transactions.
+
+    Args:
+        df (pd.DataFrame): Transactions, e.g. from combine_transactions_dataframe.
+        categorizer (categories.TransactionCategorizer): Categorizer to use,
+            get_categorizer() by default.
+
+    Returns:
+        pd.DataFrame: Enriched transactions, a column per Transaction field.
+    """
+    cleaned_df = clean.clean_transactions_dataframe(df)
+    # columns dropped by cleaning come back empty, as they do in Transactions
+    cleaned_df = model.conform_transactions_dataframe(cleaned_df)
+    return _enrich_transactions_dataframe(cleaned_df, categorizer)
+
+
+def _enrichment_version(categorizer: categories.TransactionCategorizer) -> str:
+    return f"{ENRICHMENT_VERSION}:{categorizer.rules_version()}"
+
+
+def _transaction_keys(
+    df: pd.DataFrame, null_columns: list[str] = ()
+) -> tuple[list[str], list[str]]:
+    """
+    Store keys and content hashes of raw transactions.
+
+    Transactions sharing a transaction_id or fingerprint, e.g. two identical
+    card payments to different merchants, are told apart by their occurrence,
+    so each transaction has a key of its own.
+
+    Args:
+        df (pd.DataFrame): Raw transactions.
+        null_columns (list[str]): Columns cleaning drops, hashed as missing.
+
+    Returns:
+        tuple[list[str], list[str]]: The transaction_id, or a fingerprint for
+            transactions without one, and a hash of every field.
+    """
+    fingerprints = pd.util.hash_pandas_object(df[FINGERPRINT_FIELDS], index=False)
+    content_hashes = pd.util.hash_pandas_object(
+        df.assign(**dict.fromkeys(null_columns)), index=False
+    )
+    occurrences = defaultdict(int)
+    keys = []
+    for transaction_id, fingerprint in zip(df["transaction_id"], fingerprints):
+        key = (
+            transaction_id if isinstance(transaction_id, str) else f"fp:{fingerprint:x}"
+        )
+        occurrence = occurrences[key]
+        occurrences[key] += 1
+        keys.append(f"{key}#{occurrence}" if occurrence else key)
+    return keys, [f"{content_hash:x}" for content_hash in content_hashes]
+
+
+def _load_enrichment_store(store_path: Path, version: str) -> dict:
+    store = utils.read_json(store_path) if Path(store_path).is_file() else None
+    if not store or store.get("version") != version:
+        logger.info("enrichment store is empty or out of date, enriching everything")
+        return {"version": version, "transactions": {}}
+    return store
+
+
+def enrich_incremental(
+    transactions: list[model.Transaction],
+    store_path: Path = ENRICHMENT_STORE_PATH,
+    categorizer: categories.TransactionCategorizer = None,
+) -> list[model.Transaction]:
+    """
+    Enrich transactions, reusing the results stored by previous runs.
+
+    Only transactions that are new, have changed, or were enriched with another
+    version of the rules or of ENRICHMENT_VERSION are enriched; the store is then
+    updated.
+
+    The result is that of enrich: cleaning drops a column from every
+    transaction as soon as one transaction misses it, so the columns missing
+    from any of the transactions are blanked before they are compared with the
+    store, and a column going missing re-enriches every transaction.
+
+    Args:
+        transactions (list[model.Transaction]): Transactions to enrich.
+        store_path (Path): JSON enrichment store.
+        categorizer (categories.TransactionCategorizer): Categorizer to use,
+            get_categorizer() by default. The store is versioned by its
+            rules, so editing them re-enriches every transaction.
+
+    Returns:
+        list[model.Transaction]: Enriched transactions, in input order.
+    """
+    if not transactions:
+        return []
+
+    categorizer = categorizer or get_categorizer()
+    store = _load_enrichment_store(store_path, _enrichment_version(categorizer))
+    stored = store["transactions"]
+    df = pd.DataFrame(transactions)
+    null_columns = clean.null_columns(df)
+    keys, content_hashes = _transaction_keys(df, null_columns)
+    if null_columns:
+        transactions = [
+            dataclasses.replace(transaction, **dict.fromkeys(null_columns))
+            for transaction in transactions
+        ]
+
+    delta = {
+        key: transaction
+        for key, content_hash, transaction in zip(keys, content_hashes, transactions)
+        if stored.get(key, {}).get("hash") != content_hash
+    }
+    logger.info(f"enriching {len(delta)} of {len(transactions)} transactions")
+
+    if delta:
+        enriched_delta = enrich(list(delta.values()), categorizer)
+        delta_hashes = dict(zip(keys, content_hashes))
+        for key, transaction in zip(delta, enriched_delta):
+            stored[key] = {
+                "hash": delta_hashes[key],
+                "transaction": transaction.to_dict(),
+            }
+        Path(store_path).parent.mkdir(parents=True, exist_ok=True)
+        utils.save_data_to_json(store, store_path)
+
+    return [model.Transaction.from_dict(stored[key]["transaction"]) for key in keys]
+
+
+def save_transactions(cleaned_transactions: list[model.Transaction] | pd.DataFrame):
+    # streams the records of save_data_to_json([t.to_dict() for t in ...])
+    records = model.iter_transaction_records(cleaned_transactions)
+    utils.save_chunks_to_json(records, SAVE_PATH)
 
     assert Path("../data/transactions.json").is_file(), f"file not saved"
 
@@ -80,14 +255,9 @@ class HistoricDataHelper(BaseModel):
         return transactions_df
 
     def preprocess_data(self, df: pd.DataFrame):
-        df = df.dropna(axis=1)
-        df.columns = [
-            utils.keep_text_right_of_dot(utils.to_snake_case_with_dots(key))
-            for key in df.columns
-        ]
-
+        df = utils.clean_dataframe_columns(df.dropna(axis=1))
+        # columns are clean, the records need no renaming
         transactions_dict = df.to_dict(orient="records")
-        transactions_dict = utils.clean_column_names(transactions_dict)
         historic_transactions = [
             model.Transaction.from_dict(d) for d in transactions_dict
         ]
@@ -99,6 +269,14 @@ class HistoricDataHelper(BaseModel):
         transactions = self.preprocess_data(df)
         return transactions
 
+    def preprocess_data_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """preprocess_data without materializing Transactions."""
+        df = utils.clean_dataframe_columns(df.dropna(axis=1))
+        return model.conform_transactions_dataframe(df)
+
+    def get_historic_transactions_dataframe(self) -> pd.DataFrame:
+        return self.preprocess_data_frame(self.read_data())
+
 
 def combine_transactions(
     historic_transactions: list[model.Transaction],
@@ -142,6 +320,44 @@ def combine_transactions(
     return transactions
 
 
+def combine_transactions_dataframe(
+    historic_df: pd.DataFrame, latest_df: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Columnar combine_transactions.
+
+    Same-day transactions keep their input order, where combine_transactions
+    leaves them in no particular order.
+
+    Args:
+        historic_df (pd.DataFrame): Historic transactions.
+        latest_df (pd.DataFrame): Latest transactions.
+
+    Returns:
+        pd.DataFrame: Combined transactions, a column per Transaction field.
+    """
+    logger.debug(f"joining historic and live transaction tables")
+
+    def filter_booked(df, source):
+        df = df.loc[df["status"] == "booked"].copy()
+        df["source"] = source
+        return df.dropna(axis=1, how="all")
+
+    transactions_df = pd.concat(
+        [
+            filter_booked(historic_df, source=SOURCE_HISTORIC),
+            filter_booked(latest_df, source=SOURCE_API),
+        ]
+    ).drop_duplicates()
+    transactions_df = transactions_df.sort_values(
+        by="booking_date", ascending=False, kind="stable"
+    )
+    transactions_df = transactions_df.drop_duplicates()
+    transactions_df = transactions_df.reset_index(drop=True)
+    transactions_df = transactions_df.drop(columns="source")
+    return model.conform_transactions_dataframe(transactions_df)
+
+
 async def load_transactions():
     historic_helper = HistoricDataHelper()
     requisition_api = requisition.RequisitionHelper()
@@ -155,9 +371,34 @@ async def load_transactions():
     return transactions
 
 
-async def main():
+async def load_transactions_dataframe() -> pd.DataFrame:
+    historic_helper = HistoricDataHelper()
+    requisition_api = requisition.RequisitionHelper()
+    # extract
+    latest_transactions = await requisition_api.get_latest_transactions()
+    historic_df = historic_helper.get_historic_transactions_dataframe()
+    return combine_transactions_dataframe(
+        historic_df=historic_df,
+        latest_df=model.transactions_to_dataframe(latest_transactions),
+    )
+
+
+async def main(columnar: bool = False):
+    """
+    Load, enrich and save transactions.
+
+    Args:
+        columnar (bool): Keep transactions in one DataFrame from loading to
+            saving, rather than a list of Transactions enriched incrementally.
+    """
+    if columnar:
+        transactions_df = await load_transactions_dataframe()
+        enriched_df = enrich_dataframe(transactions_df)
+        save_transactions(enriched_df)
+        return
+
     transactions = await load_transactions()
-    enriched_transactions = enrich(transactions)
+    enriched_transactions = enrich_incremental(transactions)
     save_transactions(enriched_transactions)
 
 
@@ -8,5 +8,8 @@ async def fetch_all_data(config_filepath: Path = "./config_2023_december.yaml"):
         raise FileNotFoundError(f"{config_filepath} not found")
 
     config_object = config.Config(config_filepath="./config_2023_december.yaml")
-    data = await account_api.fetch_all_nordigen_data(config_object)
+    requisition = await account_api.get_requisition(config_object.requisition_id)
+    data = await account_api.fetch_account_resources(
+        requisition["accounts"], ["transactions", "balances"]
+    )
     return data
@@ -1,5 +1,7 @@
 import asyncio
+import contextlib
 import os
+from functools import lru_cache
 
 import aiohttp
 from loguru import logger
@@ -8,251 +10,430 @@ from pathlib import Path
 # nordigen components
 from nordigen import NordigenClient
 from nordigen.types.types import Requisition
-from services.nordigen import config
+from services.nordigen import config, scheduler, tokens
+from services.nordigen import cache as response_cache
+from services.nordigen import incremental as incremental_fetch
 import utils
 
+FETCHED_DIRECTORY = Path("../data/fetched")
+ACCOUNT_DETAILS_PATH = FETCHED_DIRECTORY / "accounts.json"
+METADATA_PATH = FETCHED_DIRECTORY / "metadata.json"
+BALANCES_PATH = FETCHED_DIRECTORY / "balances.json"
+TRANSACTIONS_PATH = FETCHED_DIRECTORY / "transactions.json"
+REQUEST_BUDGETS_PATH = FETCHED_DIRECTORY / "request_budgets.json"
+WATERMARKS_PATH = FETCHED_DIRECTORY / "watermarks.json"
+RESPONSE_CACHE_DIRECTORY = FETCHED_DIRECTORY / "cache"
+
+# resources of an account, each fetched by CustomAccountApi.get_<resource>
+ACCOUNT_RESOURCES = ["details", "transactions", "balances", "metadata"]
+RESOURCE_PATHS = {
+    "details": ACCOUNT_DETAILS_PATH,
+    "transactions": TRANSACTIONS_PATH,
+    "balances": BALANCES_PATH,
+    "metadata": METADATA_PATH,
+}
+
+
+def create_session(
+    connections_per_host: int = config.CONNECTIONS_PER_HOST,
+    keepalive_timeout: float = config.KEEPALIVE_TIMEOUT,
+    dns_cache_ttl: int = config.DNS_CACHE_TTL,
+    timeout: float = config.REQUEST_TIMEOUT,
+    ssl=True,
+) -> aiohttp.ClientSession:
+    """
+    Session for account API calls, shared so that connections (and their TLS
+    handshakes) are reused across requests and accounts. Close it, or use it
+    with async with, when done.
+
+    Args:
+        connections_per_host (int): Maximum open connections to a host.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+        dns_cache_ttl (int): Seconds a resolved host is cached.
+        timeout (float): Total seconds per request.
+        ssl: See aiohttp.TCPConnector, e.g. an ssl.SSLContext.
+    """
+    connector = aiohttp.TCPConnector(
+        limit_per_host=connections_per_host,
+        keepalive_timeout=keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+        ssl=ssl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)
+    )
+
+
+def resource_url(resource: str, account_id: str, date_from: str = None) -> str:
+    """Endpoint url of a resource of ACCOUNT_RESOURCES."""
+    if resource == "transactions":
+        return config.transactions_endpoint(account_id, date_from=date_from)
+    return getattr(config, f"{resource}_endpoint")(account_id)
+
 
 class CustomAccountApi:
-    def __init__(self, access_token: str, account_id: str):
+    def __init__(
+        self,
+        access_token: str,
+        account_id: str,
+        session: aiohttp.ClientSession = None,
+        scheduler: scheduler.RequestScheduler = None,
+        cache: response_cache.ResponseCache = None,
+    ):
         logger.debug(f"Initialising API")
         self.access_token = access_token
         self.account_id = account_id
+        self.session = session
+        self.scheduler = scheduler
+        self.cache = cache
 
-    async def get_transactions(self):
-        logger.debug(f"Getting transactions for {self.account_id}")
+    async def _get(self, resource: str, **params):
         return await self.api_call(
             self.access_token,
             self.account_id,
-            config.transactions_endpoint(self.account_id),
+            resource_url(resource, self.account_id, **params),
+            session=self.session,
+            endpoint=resource,
+            scheduler=self.scheduler,
+            cache=self.cache,
         )
 
+    async def get_transactions(self, date_from: str = None):
+        logger.debug(f"Getting transactions for {self.account_id}")
+        return await self._get("transactions", date_from=date_from)
+
     async def get_balances(self):
         logger.debug(f"Getting balances for {self.account_id}")
-        return await self.api_call(
-            self.access_token,
-            self.account_id,
-            config.balances_endpoint(self.account_id),
-        )
+        return await self._get("balances")
+
+    async def get_details(self):
+        logger.debug(f"Getting account details for {self.account_id}")
+        return await self._get("details")
 
     async def get_metadata(self):
         logger.debug(f"Getting account metadata for {self.account_id}")
+        data = await self._get("metadata")
+        # missing metadata key in api
+        return {"metadata": data}
 
     @staticmethod
-    async def api_call(access_token, account_id, url: str):
+    async def api_call(
+        access_token,
+        account_id,
+        url: str,
+        session: aiohttp.ClientSession = None,
+        endpoint: str = None,
+        scheduler: scheduler.RequestScheduler = None,
+        cache: response_cache.ResponseCache = None,
+    ):
+        """
+        GET url with session, or with a session of its own when None. With a
+        scheduler, the request is paced and retried within the rate limits of
+        the account and endpoint. With a cache, fresh responses of the
+        endpoint are served from it.
+        """
+        if cache is not None:
+            data = cache.get(endpoint, account_id, url, response_cache.MISSING)
+            if data is not response_cache.MISSING:
+                return data
+
+        if session is None:
+            async with create_session() as session:
+                return await CustomAccountApi.api_call(
+                    access_token,
+                    account_id,
+                    url,
+                    session=session,
+                    endpoint=endpoint,
+                    scheduler=scheduler,
+                    cache=cache,
+                )
+
         headers = {
             "Accept": "application/json",
             "Authorization": f"Bearer {access_token}",
         }
-        async with aiohttp.ClientSession() as session:
+        if scheduler is not None:
+            data = await scheduler.request(
+                session, url, headers, account_id, endpoint or url
+            )
+        else:
             async with session.get(url, headers=headers) as response:
                 response.raise_for_status()
                 data = await response.json()
-            logger.debug(f"completed acc {account_id}, {url}")
-            return data
+        logger.debug(f"completed acc {account_id}, {url}")
+        if cache is not None:
+            cache.set(endpoint, account_id, url, data)
+        return data
 
 
-def initialise_client() -> NordigenClient:
-    """
-    return: Gets an initialised and credentialed Nordigen client
-    """
-    # get dev credentials
+@lru_cache(maxsize=None)
+def get_response_cache() -> response_cache.ResponseCache:
+    """Cache of API responses, shared by every fetch."""
+    return response_cache.ResponseCache(RESPONSE_CACHE_DIRECTORY)
+
+
+@lru_cache(maxsize=None)
+def get_request_budgets() -> scheduler.RequestBudgets:
+    """Daily quotas of the account API, shared by every fetch."""
+    return scheduler.RequestBudgets(REQUEST_BUDGETS_PATH)
+
 
-    # intialise client
-    client = NordigenClient(
+@lru_cache(maxsize=None)
+def get_token_manager(secret_id: str, secret_key: str) -> tokens.TokenManager:
+    """Token manager, and its client, shared by every fetch of these credentials."""
+    return tokens.TokenManager(secret_id=secret_id, secret_key=secret_key)
+
+
+def get_default_token_manager() -> tokens.TokenManager:
+    # get dev credentials
+    return get_token_manager(
         secret_id=os.environ.get("nordigen_id"),
         secret_key=os.environ.get("nordigen_key"),
     )
 
-    # exchange token
-    token_data = client.generate_token()
-    new_token = client.exchange_token(token_data["refresh"])
 
-    # logger.debug(f"new token: {new_token}")
-    # logger.debug(f"refresh: {token_data['refresh']}")
-    return client
-
-
-def get_requisition(requisition_id: str) -> Requisition:
-    """
-    return: a Nordigen Requisition
+def initialise_client() -> NordigenClient:
     """
-    client = initialise_client()
-    return client.requisition.get_requisition_by_id(requisition_id=requisition_id)
-
+    return: Gets an initialised and credentialed Nordigen client
 
-async def fetch_account_data(account_id, client):
+    The client is shared and its access token only renewed when it expires,
+    see tokens.TokenManager.
     """
-    Fetch account transactions and balances from Nordigen API for a given account ID.
+    return get_default_token_manager().get_client()
 
-    Args:
-        account_id (str): The account ID to fetch data for.
-        api_client (nordigen_api.NordigenClient): The initialized Nordigen API client.
 
-    Returns:
-        list: A list containing the account_id and the results (transactions and balances).
-    """
-    accounts_api = CustomAccountApi(client.token, account_id)
-    transactions_and_balances = await asyncio.gather(
-        accounts_api.get_transactions(), accounts_api.get_balances()
-    )
-    return [account_id, transactions_and_balances]
+async def initialise_client_async() -> NordigenClient:
+    """initialise_client without blocking the event loop on a token renewal."""
+    token_manager = get_default_token_manager()
+    await token_manager.get_token_async()
+    return token_manager.client
 
 
-async def fetch_all_nordigen_data(requisition_id: str):
+async def get_requisition(
+    requisition_id: str, client: NordigenClient = None
+) -> Requisition:
     """
-    Fetch data for all accounts from Nordigen API using an initialized Nordigen API client.
+    return: a Nordigen Requisition
 
-    Returns:
-        dict: A dictionary containing the fetched data.
+    The token is renewed, and the blocking client called, without blocking
+    the event loop.
     """
-    # main
-    api_client: NordigenClient = initialise_client()
-    requisition: Requisition = get_requisition(requisition_id=requisition_id)
-    accounts = requisition.get("accounts")
-
-    if not accounts:
-        logger.warning("no accounts found")
-        raise Exception("no accounts found")
-
-    # fetch data for all accounts
-    # event_loop = asyncio.get_event_loop()
-    fetched_data = await asyncio.gather(
-        *(
-            fetch_account_data(account_id, api_client)
-            for account_id in requisition["accounts"]
-        ),
-        # loop=event_loop,
-    )
-
-    return {"data": fetched_data}
+    url = config.requisition_endpoint(requisition_id)
+    requisition = get_response_cache().get("requisition", None, url)
+    if requisition is None:
+        client = client or await initialise_client_async()
+        requisition = await asyncio.to_thread(
+            client.requisition.get_requisition_by_id, requisition_id=requisition_id
+        )
+        get_response_cache().set("requisition", None, url, requisition)
+    return requisition
 
 
-def parse_data(data):
+async def fetch_account_resources(
+    account_ids: list[str],
+    resources: list[str] = ACCOUNT_RESOURCES,
+    session: aiohttp.ClientSession = None,
+    date_from: dict[str, str] = None,
+    cache: response_cache.ResponseCache = None,
+) -> dict[str, dict[str, dict]]:
     """
-    Parse the fetched data from Nordigen API.
+    Fetch resources of accounts, all requests concurrently, within the rate
+    limits of the API (see scheduler.RequestScheduler).
 
     Args:
-        data (dict): The fetched data from Nordigen API.
+        account_ids (list[str]): Accounts to fetch.
+        resources (list[str]): Resources of each account, of ACCOUNT_RESOURCES.
+        session (aiohttp.ClientSession): Session for the calls. By default one
+            is created for, and closed after, this fetch.
+        date_from (dict[str, str]): Earliest booking date of the transactions
+            fetched, by account id. Accounts without one are fetched in full.
+        cache (response_cache.ResponseCache): Cache responses are served from
+            while fresh, get_response_cache by default.
 
     Returns:
-        dict: A dictionary containing the parsed data.
+        dict[str, dict[str, dict]]: Response by resource by account id.
     """
-    balance_data = {}
-    transaction_data = {}
-    for account_id, results in data["data"]:
-        transactions, balances = results
-        balance_data[account_id] = balances
-        transaction_data[account_id] = transactions
-
-    return balance_data, transaction_data
-
-
-def fetch_account_details(account_ids) -> dict[str, dict]:
-    client = initialise_client()
-    account_details = {}
-    for account_id in account_ids:
-        account = client.account_api(id=account_id)
-        # parent
-        details = account.get_details()
-        account_details[account_id] = details
-    return account_details
-
-
-def load_acount_details(account_ids: list[str], overwrite=False):
-    account_details_path = Path("../data/fetched/accounts.json")
-    if overwrite or not account_details_path.is_file():
-        logger.debug("fetching account details")
-        account_details_dict = fetch_account_details(account_ids)
-        utils.save_data_to_json(account_details_dict, account_details_path)
-
-    return utils.read_json(account_details_path)
-
-
-def fetch_account_metadata(account_ids):
-    client = initialise_client()
-    metadata = {}
-    for account_id in account_ids:
-        account = client.account_api(id=account_id)
-        # parent
-        data = account.get_metadata()
-        # missing metadata key in api
-        metadata[account_id] = {"metadata": data}
-    return metadata
+    date_from = date_from or {}
+    cache = cache or get_response_cache()
+    api_client: NordigenClient = await initialise_client_async()
+    async with contextlib.AsyncExitStack() as stack:
+        if session is None:
+            session = await stack.enter_async_context(create_session())
+
+        request_budgets = get_request_budgets()
+        request_scheduler = scheduler.RequestScheduler(request_budgets)
+        apis = [
+            CustomAccountApi(
+                api_client.token,
+                account_id,
+                session=session,
+                scheduler=request_scheduler,
+                cache=cache,
+            )
+            for account_id in account_ids
+        ]
+        requests = [(api, resource) for api in apis for resource in resources]
+        # fail before spending any quota if some of it is used up, cached
+        # responses spend none
+        request_budgets.check(
+            [
+                (api.account_id, resource)
+                for api, resource in requests
+                if not cache.contains(
+                    resource,
+                    api.account_id,
+                    resource_url(
+                        resource, api.account_id, date_from.get(api.account_id)
+                    ),
+                )
+            ]
+        )
+        try:
+            # unlike gather, cancels the requests not yet sent on a failure
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(
+                        api.get_transactions(date_from=date_from.get(api.account_id))
+                        if resource == "transactions"
+                        else getattr(api, f"get_{resource}")()
+                    )
+                    for api, resource in requests
+                ]
+        except* Exception as errors:
+            raise errors.exceptions[0]
+
+    fetched = {account_id: {} for account_id in account_ids}
+    for (api, resource), task in zip(requests, tasks):
+        fetched[api.account_id][resource] = task.result()
+    return fetched
+
+
+async def fetch_account_details(account_ids) -> dict[str, dict]:
+    fetched = await fetch_account_resources(account_ids, ["details"])
+    return {account_id: fetched[account_id]["details"] for account_id in account_ids}
+
+
+async def load_acount_details(account_ids: list[str], overwrite=False):
+    """Account details by account id, cached, see get_response_cache."""
+    if overwrite:
+        for account_id in account_ids:
+            get_response_cache().invalidate("details", account_id)
+    account_details_dict = await fetch_account_details(account_ids)
+    utils.save_data_to_json(account_details_dict, ACCOUNT_DETAILS_PATH)
+    return account_details_dict
+
+
+async def fetch_account_metadata(account_ids):
+    fetched = await fetch_account_resources(account_ids, ["metadata"])
+    return {account_id: fetched[account_id]["metadata"] for account_id in account_ids}
+
+
+async def load_account_metadata(account_ids: list[str], overwrite=False):
+    """Account metadata by account id, cached, see get_response_cache."""
+    if overwrite:
+        for account_id in account_ids:
+            get_response_cache().invalidate("metadata", account_id)
+    metadata_dict = await fetch_account_metadata(account_ids)
+    utils.save_data_to_json(metadata_dict, METADATA_PATH)
+    return metadata_dict
 
 
-def load_account_metadata(account_ids: list[str], overwrite=False):
-    metadata_path = Path("../data/fetched/metadata.json")
-    if overwrite or not metadata_path.is_file():
-        logger.debug("fetching account metadata")
-        metadata_dict = fetch_account_metadata(account_ids)
-        utils.save_data_to_json(metadata_dict, metadata_path)
-    return utils.read_json(metadata_path)
+async def load_latest_account_data(requisition_id, overwrite=False):
+    """
+    Balances and transactions by account id, fetched as get_latest_data does:
+    only the transactions since those stored, merged into them.
 
+    Args:
+        requisition_id (str): Requisition of the accounts.
+        overwrite (bool): Fetch again rather than serve cached responses.
 
-async def load_latest_account_data(requisition_id, overwrite=False):
-    path_balance = Path("../data/fetched/balances.json")
-    path_transactions = Path("../data/fetched/transactions.json")
+    Returns:
+        tuple[dict, dict]: Balances and transactions by account id.
+    """
+    if overwrite:
+        for resource in ["transactions", "balances"]:
+            get_response_cache().invalidate(resource)
+    await get_latest_data(requisition_id)
+    return utils.read_json(BALANCES_PATH), utils.read_json(TRANSACTIONS_PATH)
 
-    if overwrite or (not path_balance.is_file() and not path_transactions.is_file()):
-        logger.debug("fetching account data")
 
-        data = await fetch_all_nordigen_data(requisition_id=requisition_id)
-        balance_data, transaction_data = parse_data(data)
-        utils.save_data_to_json(balance_data, path_balance)
-        utils.save_data_to_json(transaction_data, path_transactions)
+async def load_requisition(requisition_id, overwrite=False) -> dict:
+    """Requisition by id, cached, see get_response_cache."""
+    if overwrite:
+        get_response_cache().invalidate("requisition")
+    requisition = {requisition_id: await get_requisition(requisition_id)}
+    utils.save_data_to_json(requisition, FETCHED_DIRECTORY / "requisition.json")
+    return requisition
 
-    return utils.read_json(path_balance), utils.read_json(path_transactions)
 
+async def get_latest_data(requisition_id: str, incremental: bool = True):
+    """
+    Fetch the latest data of the accounts of a requisition into a json file
+    of account data. Responses still fresh in the response cache (see
+    config.CACHE_TTLS) are not fetched again.
 
-def load_requisition(requisition_id) -> dict:
-    requisition_filepath = Path("../data/fetched/requisition.json")
-    if not requisition_filepath.is_file():
-        logger.debug("fetching requisition")
-        requisition = {requisition_id: get_requisition(requisition_id)}
-        utils.save_data_to_json(requisition, requisition_filepath)
-    else:
-        logger.debug("requisition already fetched")
-    return utils.read_json(requisition_filepath)
+    Args:
+        requisition_id (str): Requisition of the accounts.
+        incremental (bool): Fetch only the transactions since those stored
+            (see incremental), rather than each account's full history.
 
+    Returns:
+        Path: The json file.
+    """
 
-async def get_latest_data(requisition_id: str):
     def get_output_filepath():
-        output_directory = Path("../data/fetched")
-        output_path = output_directory / f"{utils.today()}_data.json"
+        output_path = FETCHED_DIRECTORY / f"{utils.today()}_data.json"
         return output_path
 
-    if get_output_filepath().is_file():
-        # do not requery today's data
-        logger.info("today's data exists")
-        return get_output_filepath()
-
     # get requisition
-    requisition = load_requisition(requisition_id=requisition_id)
+    requisition = await load_requisition(requisition_id=requisition_id)
     account_ids = requisition.get(requisition_id, {}).get("accounts", [])
 
     if not account_ids:
         raise ValueError("no accounts found")
 
-    # get static data
-    account_details_dict = load_acount_details(account_ids=account_ids, overwrite=False)
-    account_metadata_dict = load_account_metadata(
-        account_ids=account_ids, overwrite=False
+    # all resources in one go, each cached for as long as it stays fresh
+    resources = ACCOUNT_RESOURCES
+    stored_transactions, watermarks, date_from = {}, {}, {}
+    if incremental and TRANSACTIONS_PATH.is_file():
+        stored_transactions = utils.read_json(TRANSACTIONS_PATH) or {}
+        watermarks = incremental_fetch.load_watermarks(WATERMARKS_PATH)
+        date_from = incremental_fetch.get_date_from(
+            watermarks, stored_transactions, account_ids
+        )
+    logger.debug(f"fetching {', '.join(resources)} of {len(account_ids)} accounts")
+    fetched = await fetch_account_resources(account_ids, resources, date_from=date_from)
+
+    transactions, watermarks = incremental_fetch.update_transactions(
+        stored_transactions,
+        {account_id: fetched[account_id]["transactions"] for account_id in account_ids},
+        date_from,
+        watermarks,
     )
 
-    # load dynamic data for account
-    (
-        account_balances_dict,
-        account_transactions_dict,
-    ) = await load_latest_account_data(requisition_id=requisition_id, overwrite=True)
+    account_data = {}
+    for resource in ACCOUNT_RESOURCES:
+        if resource == "transactions":
+            # the whole store, accounts outside the requisition included.
+            # Watermarks are saved last, a stale one only widens the next fetch
+            account_data[resource] = transactions
+            utils.save_data_to_json(transactions, TRANSACTIONS_PATH)
+            utils.save_data_to_json(watermarks, WATERMARKS_PATH)
+        else:
+            account_data[resource] = {
+                account_id: fetched[account_id][resource] for account_id in account_ids
+            }
+            utils.save_data_to_json(account_data[resource], RESOURCE_PATHS[resource])
 
     # try:
     # package data
     data = {
         id: {
-            **account_details_dict[id],
-            **account_transactions_dict[id],
-            **account_balances_dict[id],
-            **account_metadata_dict[id],
+            key: value
+            for resource in ACCOUNT_RESOURCES
+            for key, value in account_data[resource][id].items()
         }
         for id in account_ids
     }
@@ -0,0 +1,132 @@
+"""
+On-disk cache of API responses.
+
+Responses are kept as json files under <directory>/<resource>/<account id>/,
+named by the sha256 of the request url (query included), and served until
+they are older than the time to live of their resource. Files are written
+atomically and the least recently used are evicted once the cache outgrows
+its size bound.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from services.nordigen import config
+import utils
+
+MISSING = object()
+
+
+class ResponseCache:
+    """
+    Cache of json responses by resource, account and url.
+
+    Args:
+        directory (Path): Cache directory.
+        ttls (dict[str, float]): Seconds a response of each resource is served
+            for. Resources without one are not cached.
+        max_bytes (int): Size above which the least recently used responses
+            are evicted.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttls: dict[str, float] = None,
+        max_bytes: int = config.CACHE_MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.ttls = config.CACHE_TTLS if ttls is None else ttls
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def path(self, resource: str, account_id: str, url: str) -> Path:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / resource / (account_id or "_") / f"{key}.json"
+
+    def get(self, resource: str, account_id: str, url: str, default=None):
+        """The cached response, default if missing or expired."""
+        ttl = self.ttls.get(resource)
+        path = self.path(resource, account_id, url)
+        if not ttl or not path.is_file():
+            return default
+        try:
+            if time.time() - path.stat().st_mtime > ttl:
+                return default
+            with open(path, "r") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return default
+        # last use, for eviction, apart from the write time the ttl is about
+        os.utime(path, (time.time(), path.stat().st_mtime))
+        logger.debug(f"cached {resource} of {account_id or url}")
+        return entry["response"]
+
+    def contains(self, resource: str, account_id: str, url: str) -> bool:
+        return self.get(resource, account_id, url, MISSING) is not MISSING
+
+    def set(self, resource: str, account_id: str, url: str, response):
+        if not self.ttls.get(resource):
+            return
+        path = self.path(resource, account_id, url)
+        previous = path.stat().st_size if path.is_file() else 0
+        with utils.atomic_write(path) as file:
+            json.dump({"url": url, "response": response}, file)
+        size = path.stat().st_size
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size - previous
+        self._evict()
+
+    def invalidate(self, resource: str = None, account_id: str = None) -> int:
+        """
+        Drop the cached responses of a resource, of an account, of both, or
+        all of them when neither is given.
+
+        Returns:
+            int: Number of responses dropped.
+        """
+        pattern = f"{resource or '*'}/{account_id or '*'}/*.json"
+        dropped = 0
+        for path in self.directory.glob(pattern):
+            path.unlink(missing_ok=True)
+            dropped += 1
+        if resource is None and account_id is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        with self._lock:
+            self._size = None
+        logger.debug(f"invalidated {dropped} cached responses")
+        return dropped
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.directory.glob("*/*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            if self._size <= self.max_bytes:
+                return
+            # least recently used first
+            for _, size, path in sorted(self._entries()):
+                if self._size <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                self._size -= size
+                logger.debug(f"evicted {path.name}")
@@ -7,9 +7,35 @@ from pathlib import Path
 
 import utils
 
-
 URL_PREFIX = "https://bankaccountdata.gocardless.com/api/v2"
 
+# connection pool of the account api session, see account_api.create_session
+CONNECTIONS_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 30
+DNS_CACHE_TTL = 300
+REQUEST_TIMEOUT = 60
+
+# rate limiting of account api requests, see scheduler.RequestScheduler
+MAX_CONCURRENT_REQUESTS = 10
+MAX_CONCURRENT_ACCOUNT_REQUESTS = 4
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60
+
+# days before the latest booked transaction fetched again, for rows posted late
+TRANSACTIONS_OVERLAP_DAYS = 7
+
+# seconds api responses are cached for by resource, see cache.ResponseCache.
+# Transactions are cached per date_from, so per watermark
+CACHE_TTLS = {
+    "requisition": 24 * 60 * 60,
+    "details": 7 * 24 * 60 * 60,
+    "metadata": 24 * 60 * 60,
+    "balances": 15 * 60,
+    "transactions": 60 * 60,
+}
+CACHE_MAX_BYTES = 256 * 2**20
+
 
 def get_credentials(env_path: str = ".env") -> tuple[str, str]:
     load_dotenv(env_path)
@@ -54,8 +80,14 @@ class Config:
             raise e
 
 
-def transactions_endpoint(account_id):
+def requisition_endpoint(requisition_id):
+    return f"{URL_PREFIX}/requisitions/{requisition_id}/"
+
+
+def transactions_endpoint(account_id, date_from: str = None):
     # return f"https://ob.nordigen.com/api/v2/accounts/{account_id}/transactions/"
+    if date_from:
+        return f"{URL_PREFIX}/accounts/{account_id}/transactions?date_from={date_from}"
     return f"{URL_PREFIX}/accounts/{account_id}/transactions"
 
 
@@ -64,6 +96,10 @@ def details_endpoint(account_id):
     # return f"https://ob.nordigen.com/api/v2/accounts/{account_id}/details/"
 
 
+def metadata_endpoint(account_id):
+    return f"{URL_PREFIX}/accounts/{account_id}/"
+
+
 def balances_endpoint(account_id):
     return f"{URL_PREFIX}/accounts/{account_id}/balances/"
     # return f"https://ob.nordigen.com/api/v2/accounts/{account_id}/balances/"
@@ -0,0 +1,123 @@
+"""
+Incremental transaction fetches.
+
+The booking date of the latest booked transaction of each account (its
+watermark) is kept on disk. The next fetch asks for transactions from the
+watermark less an overlap, for rows posted late or still pending, and merges
+them into the transactions fetched before: stored booked transactions from
+the start of the fetched window on, and all stored pending ones, are replaced
+by the fetched ones.
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+
+from loguru import logger
+
+from services.nordigen import config
+import utils
+
+
+def booking_date(transaction: dict) -> str | None:
+    """Booking date of a raw transaction as YYYY-MM-DD."""
+    value = (
+        transaction.get("bookingDate")
+        or transaction.get("bookingDateTime")
+        or transaction.get("valueDate")
+    )
+    return value[:10] if value else None
+
+
+def load_watermarks(path: Path) -> dict[str, str]:
+    path = Path(path)
+    return utils.read_json(path) if path.is_file() else {}
+
+
+def get_date_from(
+    watermarks: dict[str, str],
+    stored: dict[str, dict],
+    account_ids: list[str],
+    overlap_days: int = config.TRANSACTIONS_OVERLAP_DAYS,
+) -> dict[str, str]:
+    """
+    date_from of each account with a watermark and stored transactions, the
+    others are fetched in full: a fetch from the watermark would lose the
+    history of an account missing from the stored transactions.
+    """
+    return {
+        account_id: (
+            date.fromisoformat(watermarks[account_id]) - timedelta(days=overlap_days)
+        ).isoformat()
+        for account_id in account_ids
+        if watermarks.get(account_id) and account_id in stored
+    }
+
+
+def merge_transactions(stored: dict | None, fetched: dict, date_from: str = None):
+    """
+    Merge a transactions response fetched from date_from into the stored one
+    of the same account, both as {"transactions": {"booked": [], "pending": []}}.
+
+    Without a stored response or date_from the fetched one is taken as the
+    full history of the account.
+    """
+    if stored is None or date_from is None:
+        return fetched
+
+    stored_booked = stored["transactions"].get("booked") or []
+    fetched_transactions = fetched["transactions"]
+    # fetched rows replace stored ones from date_from on, rows without a date
+    # can only be told apart by the fetch, so are replaced too
+    kept = [
+        transaction
+        for transaction in stored_booked
+        if (booked_on := booking_date(transaction)) and booked_on < date_from
+    ]
+    return {
+        **fetched,
+        "transactions": {
+            **fetched_transactions,
+            "booked": kept + (fetched_transactions.get("booked") or []),
+            "pending": fetched_transactions.get("pending") or [],
+        },
+    }
+
+
+def get_watermark(transactions: dict) -> str | None:
+    """Latest booking date of the booked transactions of a response."""
+    dates = [
+        booked_on
+        for transaction in transactions["transactions"].get("booked") or []
+        if (booked_on := booking_date(transaction))
+    ]
+    return max(dates, default=None)
+
+
+def update_transactions(
+    stored: dict[str, dict],
+    fetched: dict[str, dict],
+    date_from: dict[str, str],
+    watermarks: dict[str, str],
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """
+    Merge fetched transactions into the stored ones, by account id.
+
+    Returns:
+        tuple[dict[str, dict], dict[str, str]]: Transactions and watermarks of
+            the fetched accounts, and those of other accounts as stored.
+    """
+    transactions, watermarks = dict(stored), dict(watermarks)
+    for account_id, account_transactions in fetched.items():
+        account_date_from = date_from.get(account_id)
+        transactions[account_id] = merge_transactions(
+            stored.get(account_id), account_transactions, account_date_from
+        )
+        fetched_booked = account_transactions["transactions"].get("booked") or []
+        logger.debug(
+            f"{account_id}: {len(fetched_booked)} booked transactions"
+            f" from {account_date_from or 'the start'}"
+        )
+        watermark = get_watermark(transactions[account_id])
+        if watermark:
+            watermarks[account_id] = watermark
+    return transactions, watermarks
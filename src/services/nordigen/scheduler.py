@@ -0,0 +1,289 @@
+"""
+Rate limited scheduling of account API requests.
+
+The API limits requests per account and endpoint, and reports the state of
+each limit in response headers:
+
+    HTTP_X_RATELIMIT_LIMIT / _REMAINING / _RESET
+        requests in the current window, and seconds until it resets
+    HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_LIMIT / _REMAINING / _RESET
+        successful requests per day (the daily quota)
+
+RequestScheduler paces requests with a token bucket per account and endpoint
+fed by the first, caps concurrency globally and per account, and retries 429s
+and server errors with jittered exponential backoff. RequestBudgets keeps the
+daily quotas on disk, so a fetch that would run out of quota fails before
+spending any of it.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import aiohttp
+from loguru import logger
+
+from services.nordigen import config
+import utils
+
+RATE_LIMIT_HEADER = "HTTP_X_RATELIMIT_{}"
+QUOTA_HEADER = "HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_{}"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(Exception):
+    """A request would exceed, or exceeded, a quota that resets too late to wait."""
+
+
+def _parse_limit(headers, template: str) -> tuple[int, int, float] | None:
+    """(limit, remaining, seconds to reset) of a family of headers, if sent."""
+    try:
+        return (
+            int(headers[template.format("LIMIT")]),
+            int(headers[template.format("REMAINING")]),
+            float(headers[template.format("RESET")]),
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Pacer allowing capacity requests at once, refilled at rate per second.
+
+    sync resets the bucket from the state the server reports, spreading what
+    is left of the window over the time until it resets.
+    """
+
+    def __init__(self, capacity: float = 1.0, rate: float = float("inf")):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self, max_delay: float = float("inf")) -> bool:
+        """
+        Wait for a token and take it.
+
+        Returns:
+            bool: False, without taking a token, once the wait is longer than
+                max_delay.
+        """
+        while (delay := self.delay()) > 0:
+            if delay > max_delay:
+                return False
+            await asyncio.sleep(delay)
+        self.tokens -= 1
+        return True
+
+    def sync(self, limit: int, remaining: int, reset: float):
+        self.capacity = max(limit, 1)
+        self.tokens = remaining
+        # at least a token by the reset, when the window is used up
+        refills = max(limit - remaining, 1)
+        self.rate = refills / reset if reset > 0 else float("inf")
+        self.updated = time.monotonic()
+
+
+class RequestBudgets:
+    """
+    Daily quota left per account and endpoint, as last reported by the API,
+    kept in a json file across runs.
+
+    Args:
+        path (Path): File the budgets are kept in, None to keep them in memory.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else None
+        self.budgets = {}
+        if self.path and self.path.is_file():
+            try:
+                self.budgets = json.loads(self.path.read_text())
+            except ValueError as e:
+                logger.warning(f"ignoring unreadable {self.path}: {e}")
+
+    @staticmethod
+    def _key(account_id: str, endpoint: str) -> str:
+        return f"{account_id}/{endpoint}"
+
+    def remaining(self, account_id: str, endpoint: str) -> int | None:
+        """Requests left, None if unknown or the quota has reset since."""
+        budget = self.budgets.get(self._key(account_id, endpoint))
+        if budget is None or budget["reset_at"] <= time.time():
+            return None
+        return budget["remaining"]
+
+    def record(self, account_id: str, endpoint: str, limit, remaining, reset):
+        self.budgets[self._key(account_id, endpoint)] = {
+            "limit": limit,
+            "remaining": remaining,
+            "reset_at": time.time() + reset,
+        }
+        self._save()
+
+    def check(self, requests: list[tuple[str, str]]):
+        """
+        Raise RateLimitExceeded if any of the (account_id, endpoint) requests
+        has no quota left, before any is sent.
+        """
+        needed = defaultdict(int)
+        for account_id, endpoint in requests:
+            needed[account_id, endpoint] += 1
+        exhausted = [
+            f"{account_id} {endpoint}"
+            for (account_id, endpoint), count in needed.items()
+            if (remaining := self.remaining(account_id, endpoint)) is not None
+            and remaining < count
+        ]
+        if exhausted:
+            raise RateLimitExceeded(f"daily quota used up: {', '.join(exhausted)}")
+
+    def _save(self):
+        if not self.path:
+            return
+        with utils.atomic_write(self.path) as file:
+            json.dump(self.budgets, file)
+
+
+class RequestScheduler:
+    """
+    Sends account API requests within the API rate limits.
+
+    Create one per event loop, the budgets can be shared.
+
+    Args:
+        budgets (RequestBudgets): Daily quotas, updated from each response.
+        max_concurrency (int): Requests in flight at once.
+        max_account_concurrency (int): Requests in flight at once per account.
+        max_retries (int): Retries of a request failing with a 429, a server
+            error or a connection error.
+        backoff_base (float): Seconds before the first retry, doubled on each
+            retry and jittered.
+        backoff_max (float): Longest wait before a request or a retry. A
+            request paced, or a 429 whose limit resets, later than this is not
+            sent.
+    """
+
+    def __init__(
+        self,
+        budgets: RequestBudgets = None,
+        max_concurrency: int = config.MAX_CONCURRENT_REQUESTS,
+        max_account_concurrency: int = config.MAX_CONCURRENT_ACCOUNT_REQUESTS,
+        max_retries: int = config.MAX_RETRIES,
+        backoff_base: float = config.BACKOFF_BASE,
+        backoff_max: float = config.BACKOFF_MAX,
+    ):
+        self.budgets = budgets or RequestBudgets()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._account_semaphores = defaultdict(
+            lambda: asyncio.Semaphore(max_account_concurrency)
+        )
+        self._buckets = defaultdict(TokenBucket)
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return random.uniform(delay / 2, delay)
+
+    def _update_limits(self, account_id: str, endpoint: str, headers):
+        rate_limit = _parse_limit(headers, RATE_LIMIT_HEADER)
+        if rate_limit:
+            self._buckets[account_id, endpoint].sync(*rate_limit)
+        quota = _parse_limit(headers, QUOTA_HEADER)
+        if quota:
+            self.budgets.record(account_id, endpoint, *quota)
+
+    def _retry_delay(self, attempt: int, response, account_id, endpoint) -> float:
+        """Seconds before retrying a failed response, None to give up."""
+        if attempt >= self.max_retries:
+            return None
+        delay = self.backoff(attempt)
+        if response is None or response.status != 429:
+            return delay
+
+        reset = 0.0
+        for template in (QUOTA_HEADER, RATE_LIMIT_HEADER):
+            limit = _parse_limit(response.headers, template)
+            if limit and limit[1] <= 0:
+                reset = max(reset, limit[2])
+        if "Retry-After" in response.headers:
+            try:
+                reset = max(reset, float(response.headers["Retry-After"]))
+            except ValueError:
+                pass
+        if reset > self.backoff_max:
+            raise RateLimitExceeded(
+                f"{account_id} {endpoint} rate limited for {reset:.0f}s"
+            )
+        return max(delay, reset)
+
+    async def request(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: dict,
+        account_id: str,
+        endpoint: str,
+    ):
+        """
+        GET url as json, within the limits of the account and endpoint.
+
+        Raises:
+            RateLimitExceeded: The daily quota is used up, or the rate limit or
+                a 429 resets too late to wait.
+            aiohttp.ClientResponseError: A response failed, after any retries.
+        """
+        self.budgets.check([(account_id, endpoint)])
+        attempt = 0
+        while True:
+            # paced before taking a slot, waiting requests hold none
+            bucket = self._buckets[account_id, endpoint]
+            if not await bucket.acquire(max_delay=self.backoff_max):
+                raise RateLimitExceeded(
+                    f"{account_id} {endpoint} rate limited for {bucket.delay():.0f}s"
+                )
+            async with self._account_semaphores[account_id], self._semaphore:
+                try:
+                    async with session.get(url, headers=headers) as response:
+                        self._update_limits(account_id, endpoint, response.headers)
+                        if response.status not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            return await response.json()
+                        delay = self._retry_delay(
+                            attempt, response, account_id, endpoint
+                        )
+                        if delay is None:
+                            response.raise_for_status()
+                        status = response.status
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    delay = self._retry_delay(attempt, None, account_id, endpoint)
+                    if delay is None:
+                        raise e
+                    status = type(e).__name__
+
+            attempt += 1
+            logger.warning(
+                f"{account_id} {endpoint} failed ({status}), "
+                f"retry {attempt} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,125 @@
+"""
+Nordigen access tokens, kept in memory and on disk until they expire.
+
+An access token lasts a day and a refresh token a month, so most fetches need
+no token request at all, and the others a single refresh rather than a new
+token per client.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+from pathlib import Path
+
+from loguru import logger
+from nordigen import NordigenClient
+from requests import HTTPError
+
+import utils
+
+TOKEN_PATH = Path("../data/fetched/token.json")
+# tokens this close to expiry are renewed
+EXPIRY_MARGIN = 60
+
+
+def _is_auth_error(error: HTTPError) -> bool:
+    """A refresh rejected as such, e.g. revoked, rather than failing to be sent."""
+    status = getattr(error.response, "status_code", None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class TokenManager:
+    """
+    Access token of a Nordigen client, renewed only when it expires: with the
+    refresh token while that is valid, else with the secrets.
+
+    One manager shares one client. Threads and coroutines asking for a token at
+    the same time wait for a single renewal.
+
+    Args:
+        secret_id (str): Nordigen secret id.
+        secret_key (str): Nordigen secret key.
+        token_path (Path): File the tokens are kept in, None to keep them in
+            memory only.
+    """
+
+    def __init__(self, secret_id: str, secret_key: str, token_path: Path = TOKEN_PATH):
+        self.client = NordigenClient(secret_id=secret_id, secret_key=secret_key)
+        self.token_path = Path(token_path) if token_path else None
+        # tokens of other credentials in the file are ignored
+        self._owner = hashlib.sha256(secret_id.encode()).hexdigest()
+        self._tokens = self._load()
+        self._lock = threading.Lock()
+        # an asyncio.Lock belongs to one event loop
+        self._async_locks = weakref.WeakKeyDictionary()
+
+    def _valid(self, name: str) -> bool:
+        expires_at = self._tokens.get(f"{name}_expires_at", 0)
+        return name in self._tokens and expires_at - EXPIRY_MARGIN > time.time()
+
+    def _load(self) -> dict:
+        if not self.token_path or not self.token_path.is_file():
+            return {}
+        try:
+            tokens = json.loads(self.token_path.read_text())
+        except ValueError as e:
+            logger.warning(f"ignoring unreadable {self.token_path}: {e}")
+            return {}
+        return tokens if tokens.get("owner") == self._owner else {}
+
+    def _save(self):
+        if not self.token_path:
+            return
+        # readable by the owner only
+        with utils.atomic_write(self.token_path, permissions=0o600) as file:
+            json.dump({"owner": self._owner, **self._tokens}, file)
+
+    def _renew(self):
+        now = time.time()
+        response = None
+        if self._valid("refresh"):
+            logger.debug("refreshing access token")
+            try:
+                response = self.client.exchange_token(self._tokens["refresh"])
+            except HTTPError as e:
+                if not _is_auth_error(e):
+                    raise e
+                # revoked, or the secrets rotated, new tokens replace it
+                logger.warning(f"refresh token rejected, generating new tokens: {e}")
+                del self._tokens["refresh"]
+        if response is None:
+            logger.debug("generating new tokens")
+            response = self.client.generate_token()
+            self._tokens["refresh"] = response["refresh"]
+            self._tokens["refresh_expires_at"] = now + response["refresh_expires"]
+        self._tokens["access"] = response["access"]
+        self._tokens["access_expires_at"] = now + response["access_expires"]
+        self._save()
+
+    def get_token(self) -> str:
+        """A valid access token, renewed if needed."""
+        if not self._valid("access"):
+            with self._lock:
+                # renewed while waiting for the lock
+                if not self._valid("access"):
+                    self._renew()
+        if self.client.token != self._tokens["access"]:
+            self.client.token = self._tokens["access"]
+        return self._tokens["access"]
+
+    async def get_token_async(self) -> str:
+        """get_token without blocking the event loop while renewing."""
+        if not self._valid("access"):
+            loop = asyncio.get_running_loop()
+            async with self._async_locks.setdefault(loop, asyncio.Lock()):
+                if not self._valid("access"):
+                    await asyncio.to_thread(self.get_token)
+        return self.get_token()
+
+    def get_client(self) -> NordigenClient:
+        """The shared client, with a valid access token."""
+        self.get_token()
+        return self.client
@@ -1,7 +1,12 @@
 import json
+import os
+import tempfile
 import yaml
 
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
+from typing import IO, Iterable, Iterator
 
 
 def read_yaml(yaml_path):
@@ -25,11 +30,62 @@ def read_json(filepath) -> None | list[dict] | list | list[dict]:
         return None
 
 
+@contextmanager
+def atomic_write(
+    filepath: Path, mode: str = "w", permissions: int = None
+) -> Iterator[IO]:
+    """
+    Open a file to write filepath through: a temporary file in the same
+    directory, renamed over filepath once written and removed if writing fails,
+    so readers never see a partial file.
+
+    Args:
+        filepath (Path): File to write, its directory is created if missing.
+        mode (str): "w" for text, "wb" for bytes.
+        permissions (int): Mode of the file, e.g. 0o600. Temporary files are
+            readable by the owner only by default.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    file = tempfile.NamedTemporaryFile(
+        mode, dir=filepath.parent, suffix=".tmp", delete=False
+    )
+    try:
+        with file:
+            yield file
+        if permissions is not None:
+            os.chmod(file.name, permissions)
+        os.replace(file.name, filepath)
+    except BaseException:
+        Path(file.name).unlink(missing_ok=True)
+        raise
+
+
 def save_data_to_json(data_object: list | list[dict], filepath: Path):
     with open(filepath, "w") as file:
         json.dump(data_object, file)
 
 
+def save_chunks_to_json(chunks: Iterable[list], filepath: Path):
+    """
+    Stream a list given in chunks to a JSON file.
+
+    Writes the same bytes as save_data_to_json(all items, filepath), encoding a
+    chunk at a time with the C encoder, where json.dump encodes item by item
+    in Python.
+    """
+    with open(filepath, "w") as file:
+        file.write("[")
+        separator = ""
+        for chunk in chunks:
+            if not chunk:
+                continue
+            file.write(separator)
+            file.write(json.dumps(chunk)[1:-1])
+            separator = ", "
+        file.write("]")
+
+
 def to_snake_case_with_dots(column_name):
     result = column_name[0].lower()
     for char in column_name[1:]:
@@ -50,12 +106,21 @@ def keep_text_right_of_dot(column):
     return result
 
 
+@lru_cache(maxsize=None)
+def clean_column_name(column_name: str) -> str:
+    """camelCase to snake_case, keeping right of the last '.'. Memoized."""
+    return keep_text_right_of_dot(to_snake_case_with_dots(column_name))
+
+
+@lru_cache(maxsize=2**10)
+def clean_keys(keys: tuple[str, ...]) -> tuple[str, ...]:
+    """Clean names of a set of keys or columns, computed once per set."""
+    return tuple(clean_column_name(key) for key in keys)
+
+
 def clean_column_names(data):
     def clean(d):
-        return {
-            keep_text_right_of_dot(to_snake_case_with_dots(key)): value
-            for key, value in d.items()
-        }
+        return dict(zip(clean_keys(tuple(d)), d.values()))
 
     if isinstance(data, dict):
         return clean(data)
@@ -66,6 +131,12 @@ def clean_column_names(data):
     return cleaned_data
 
 
+def clean_dataframe_columns(df):
+    """Rename the columns of a DataFrame in place, as clean_column_names does keys."""
+    df.columns = clean_keys(tuple(df.columns))
+    return df
+
+
 def flatten_and_remove_duplicates_from_dictionary(data):
     flattened_data = []
     seen = set()
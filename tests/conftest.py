@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch) -> Path:
+    # paths such as ../data/... are relative to src, keep them in tmp_path
+    workdir = tmp_path / "src"
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    return tmp_path / "data"
@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.nordigen import account_api
+from services.nordigen.cache import ResponseCache
+
+
+@pytest.fixture
+def calls(monkeypatch) -> list:
+    """Account API calls made, answered with their resource url."""
+    calls = []
+
+    async def api_call(access_token, account_id, url, session=None, **kwargs):
+        calls.append((account_id, kwargs["endpoint"], session))
+        return {"url": url}
+
+    async def initialise_client_async():
+        return SimpleNamespace(token="token")
+
+    monkeypatch.setattr(
+        account_api.CustomAccountApi, "api_call", staticmethod(api_call)
+    )
+    monkeypatch.setattr(account_api, "initialise_client_async", initialise_client_async)
+    return calls
+
+
+def test_resources_are_fetched_over_one_session(calls, tmp_path):
+    resources = ["transactions", "balances", "details"]
+
+    fetched = asyncio.run(
+        account_api.fetch_account_resources(
+            ["a", "b"], resources, cache=ResponseCache(tmp_path / "cache")
+        )
+    )
+
+    assert sorted((account_id, endpoint) for account_id, endpoint, _ in calls) == [
+        (account_id, resource)
+        for account_id in ("a", "b")
+        for resource in sorted(resources)
+    ]
+    sessions = {session for _, _, session in calls}
+    assert len(sessions) == 1 and None not in sessions
+    assert fetched["b"]["balances"] == {
+        "url": account_api.resource_url("balances", "b")
+    }
+
+
+def test_resources_are_fetched_over_the_session_given(calls, tmp_path):
+    async def fetch():
+        async with account_api.create_session() as session:
+            await account_api.fetch_account_resources(
+                ["a", "b"], session=session, cache=ResponseCache(tmp_path / "cache")
+            )
+            return session
+
+    session = asyncio.run(fetch())
+
+    assert all(called is session for _, _, called in calls)
+
+
+def test_metadata_is_wrapped_under_metadata(calls):
+    api = account_api.CustomAccountApi("token", "a")
+
+    metadata = asyncio.run(api.get_metadata())
+
+    assert metadata == {"metadata": {"url": account_api.resource_url("metadata", "a")}}
+
+
+def test_account_metadata_by_account_id(calls, tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "cache")
+    monkeypatch.setattr(account_api, "get_response_cache", lambda: cache)
+
+    metadata = asyncio.run(account_api.fetch_account_metadata(["a", "b"]))
+
+    assert metadata == {
+        account_id: {
+            "metadata": {"url": account_api.resource_url("metadata", account_id)}
+        }
+        for account_id in ("a", "b")
+    }
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.nordigen import account_api
+from services.nordigen.cache import MISSING, ResponseCache
+from services.nordigen.scheduler import RateLimitExceeded, RequestBudgets
+
+
+@pytest.fixture
+def cache(tmp_path) -> ResponseCache:
+    return ResponseCache(tmp_path / "cache", ttls={"balances": 60, "details": 60})
+
+
+def age(cache: ResponseCache, resource, account_id, url, seconds: float):
+    path = cache.path(resource, account_id, url)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_responses_expire_after_their_ttl(cache):
+    cache.set("balances", "a", "url", {"balances": []})
+    assert cache.get("balances", "a", "url") == {"balances": []}
+
+    age(cache, "balances", "a", "url", 61)
+
+    assert cache.get("balances", "a", "url") is None
+    assert not cache.contains("balances", "a", "url")
+
+
+def test_resources_without_a_ttl_are_not_cached(cache):
+    cache.set("transactions", "a", "url", {"transactions": {}})
+
+    assert not cache.contains("transactions", "a", "url")
+
+
+def test_none_responses_are_cached(cache):
+    assert cache.get("balances", "a", "url", MISSING) is MISSING
+
+    cache.set("balances", "a", "url", None)
+
+    assert cache.get("balances", "a", "url", MISSING) is None
+    assert cache.contains("balances", "a", "url")
+
+
+def test_least_recently_used_are_evicted(cache):
+    for url in ("first", "second", "third"):
+        cache.set("balances", "a", url, {"url": url})
+    # oldest first, the first is then used again
+    for seconds, url in ((30, "first"), (20, "second"), (10, "third")):
+        age(cache, "balances", "a", url, seconds)
+    cache.get("balances", "a", "first")
+    cache.max_bytes = 3 * cache.path("balances", "a", "first").stat().st_size
+
+    cache.set("balances", "a", "fourth", {"url": "four"})
+
+    assert not cache.contains("balances", "a", "second")
+    for url in ("first", "third", "fourth"):
+        assert cache.contains("balances", "a", url)
+
+
+def test_invalidate(cache):
+    for resource in ("balances", "details"):
+        for account_id in ("a", "b"):
+            cache.set(resource, account_id, "url", {})
+
+    assert cache.invalidate("balances") == 2
+    assert cache.contains("details", "a", "url")
+    assert cache.invalidate(account_id="a") == 1
+    assert cache.contains("details", "b", "url")
+    assert cache.invalidate() == 1
+    assert not cache.directory.exists()
+
+
+def test_cached_requests_spend_no_quota(cache, tmp_path, monkeypatch):
+    url = account_api.resource_url("balances", "a")
+    cache.set("balances", "a", url, {"balances": ["cached"]})
+    budgets = RequestBudgets(tmp_path / "budgets.json")
+    for account_id in ("a", "b"):
+        budgets.record(account_id, "balances", 4, 0, 3600)
+
+    async def initialise_client_async():
+        return SimpleNamespace(token="token")
+
+    monkeypatch.setattr(account_api, "initialise_client_async", initialise_client_async)
+    monkeypatch.setattr(account_api, "get_request_budgets", lambda: budgets)
+
+    fetched = asyncio.run(
+        account_api.fetch_account_resources(["a"], ["balances"], cache=cache)
+    )
+    assert fetched == {"a": {"balances": {"balances": ["cached"]}}}
+
+    with pytest.raises(RateLimitExceeded, match="b balances"):
+        asyncio.run(
+            account_api.fetch_account_resources(["a", "b"], ["balances"], cache=cache)
+        )
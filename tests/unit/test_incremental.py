@@ -0,0 +1,69 @@
+from services.nordigen import incremental
+
+
+def response(booked=(), pending=()) -> dict:
+    return {
+        "transactions": {
+            "booked": [{"bookingDate": day, "id": day} for day in booked],
+            "pending": [{"valueDate": day} for day in pending],
+        }
+    }
+
+
+def booked_dates(transactions: dict) -> list[str]:
+    return [t["bookingDate"] for t in transactions["transactions"]["booked"]]
+
+
+def test_merge_replaces_stored_transactions_from_date_from_on():
+    stored = response(["2024-01-01", "2024-01-05", "2024-01-10"], ["2024-01-10"])
+    fetched = response(["2024-01-05", "2024-01-12"], ["2024-01-13"])
+
+    merged = incremental.merge_transactions(stored, fetched, "2024-01-05")
+
+    assert booked_dates(merged) == ["2024-01-01", "2024-01-05", "2024-01-12"]
+    assert merged["transactions"]["pending"] == [{"valueDate": "2024-01-13"}]
+
+
+def test_merge_without_stored_transactions_takes_the_fetched_ones():
+    fetched = response(["2024-01-12"])
+
+    assert incremental.merge_transactions(None, fetched) == fetched
+
+
+def test_date_from_is_the_watermark_less_the_overlap():
+    date_from = incremental.get_date_from(
+        {"a": "2024-01-10"}, {"a": response()}, ["a"], overlap_days=7
+    )
+
+    assert date_from == {"a": "2024-01-03"}
+
+
+def test_accounts_without_stored_transactions_are_fetched_in_full():
+    watermarks = {"a": "2024-01-10", "b": "2024-01-10"}
+
+    date_from = incremental.get_date_from(watermarks, {"a": response()}, ["a", "b"])
+
+    assert "a" in date_from and "b" not in date_from
+
+
+def test_update_merges_fetched_accounts_and_keeps_the_others():
+    stored = {"a": response(["2024-01-01", "2024-01-09"]), "c": response(["2023"])}
+    watermarks = {"a": "2024-01-09", "c": "2023-12-31"}
+    date_from = incremental.get_date_from(watermarks, stored, ["a", "b"])
+    fetched = {
+        "a": response(["2024-01-09", "2024-01-15"]),
+        "b": response(["2024-01-02"]),
+    }
+
+    transactions, watermarks = incremental.update_transactions(
+        stored, fetched, date_from, watermarks
+    )
+
+    assert booked_dates(transactions["a"]) == [
+        "2024-01-01",
+        "2024-01-09",
+        "2024-01-15",
+    ]
+    assert booked_dates(transactions["b"]) == ["2024-01-02"]
+    assert transactions["c"] == stored["c"]
+    assert watermarks == {"a": "2024-01-15", "b": "2024-01-02", "c": "2023-12-31"}
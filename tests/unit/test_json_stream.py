@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+from json_stream import JsonStream
+
+DOCUMENT = json.dumps(
+    {
+        "amounts": [12.50, -3, 1.5e10, 2e-3, 0, -0.25, 1234567890123],
+        "flags": [True, False, None],
+        "nested": {"text": "a \"quoted\" string", "empty": [], "n": 7},
+    }
+)
+
+
+def read(stream: JsonStream):
+    """Rebuild a document with keys, elements and value."""
+    char = stream.peek()
+    if char == "{":
+        return {key: read(stream) for key in stream.keys()}
+    if char == "[":
+        return [read(stream) for _ in stream.elements()]
+    return stream.value()
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 10))
+def test_small_chunks(chunk_size):
+    stream = JsonStream(io.StringIO(DOCUMENT), chunk_size=chunk_size)
+
+    assert read(stream) == json.loads(DOCUMENT)
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 10))
+@pytest.mark.parametrize("number", ["12.50", "1.5e10", "-2E+3", "100"])
+def test_numbers_split_across_reads(chunk_size, number):
+    document = f"[{number}, {number}]"
+    stream = JsonStream(io.StringIO(document), chunk_size=chunk_size)
+
+    assert read(stream) == json.loads(document)
+
+
+def test_number_split_at_the_default_chunk_size():
+    document = json.dumps({"pad": "x" * 65516, "n": 12.50})
+    assert document.index("12.5") < 2**16 < len(document)
+    stream = JsonStream(io.StringIO(document))
+
+    assert read(stream) == json.loads(document)
@@ -0,0 +1,57 @@
+import pickle
+
+import pandas as pd
+
+from enrich.keywords import KeywordMatcher
+
+KEYWORDS = {
+    "a": ["she", "hers"],
+    "b": ["he"],
+    "c": ["rsx"],
+    "d": ["ushers"],
+}
+
+
+def naive_matched_lists(text: str) -> list[str]:
+    return [
+        name
+        for name, keywords in KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    ]
+
+
+def test_overlapping_keywords_all_match():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    # "he" ends inside "she" and "hers", reached through fail links only
+    assert matcher.matched_lists("ushers") == ["a", "b", "d"]
+    assert matcher.matched_lists("hersx") == ["a", "b", "c"]
+    assert matcher.matched_lists("usher") == ["a", "b"]
+    assert matcher.matched_lists("shx") == []
+
+
+def test_lists_are_named_in_their_order_not_the_order_found():
+    matcher = KeywordMatcher(KEYWORDS)
+
+    assert matcher.matched_lists("rsx he she") == ["a", "b", "c"]
+
+
+def test_matches_any_keyword_in_value():
+    matcher = KeywordMatcher(KEYWORDS)
+    texts = ["ushers", "hers", "rsx", "", "s h e", "hhe", "sushersx", "he he"]
+    series = pd.Series(texts + [None] + texts, index=range(10, 27))
+
+    for name in KEYWORDS:
+        matches = matcher.matches(series, name)
+        assert matches.index.equals(series.index)
+        assert matches.tolist() == [
+            isinstance(text, str) and name in naive_matched_lists(text)
+            for text in series
+        ]
+        assert matcher.matches(series.astype("category"), name).equals(matches)
+
+
+def test_unpickled_matcher_scans_alike():
+    matcher = pickle.loads(pickle.dumps(KeywordMatcher(KEYWORDS)))
+
+    assert matcher.matched_lists("ushers") == naive_matched_lists("ushers")
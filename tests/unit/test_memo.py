@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from enrich.memo import DistinctKeyCache
+
+
+def counting(calls: list):
+    """func labelling rows by key, recording the keys it is called for."""
+
+    def func(df: pd.DataFrame) -> pd.Series:
+        calls.extend(df["key"].tolist())
+        return df["key"].fillna("missing").map(lambda key: f"label {key}")
+
+    return func
+
+
+def test_results_are_computed_once_per_key():
+    cache, calls = DistinctKeyCache(), []
+    df = pd.DataFrame({"key": ["a", "b", "a", "c", "b"]}, index=[5, 4, 3, 2, 1])
+
+    labels = cache.apply(df, ["key"], counting(calls))
+
+    assert labels.index.equals(df.index)
+    assert labels.tolist() == ["label a", "label b", "label a", "label c", "label b"]
+    assert calls == ["a", "b", "c"]
+    assert cache.apply(df, ["key"], counting(calls)).equals(labels)
+    assert calls == ["a", "b", "c"]
+    assert cache.stats() == {"hits": 3, "misses": 3, "size": 3, "maxsize": 100_000}
+
+
+def test_missing_values_are_one_key():
+    cache, calls = DistinctKeyCache(), []
+    df = pd.DataFrame({"key": ["a", np.nan, None, "a"]})
+
+    labels = cache.apply(df, ["key"], counting(calls))
+
+    assert labels.tolist() == ["label a", "label missing", "label missing", "label a"]
+    assert len(calls) == 2
+    cache.apply(pd.DataFrame({"key": [np.nan]}), ["key"], counting(calls))
+    assert len(calls) == 2
+
+
+def test_least_recently_used_keys_are_evicted():
+    cache, calls = DistinctKeyCache(maxsize=2), []
+    func = counting(calls)
+    cache.apply(pd.DataFrame({"key": ["a", "b"]}), ["key"], func)
+    cache.apply(pd.DataFrame({"key": ["a"]}), ["key"], func)
+
+    cache.apply(pd.DataFrame({"key": ["c"]}), ["key"], func)
+    assert len(cache) == 2
+
+    cache.apply(pd.DataFrame({"key": ["a", "b"]}), ["key"], func)
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_clear():
+    cache, calls = DistinctKeyCache(), []
+    df = pd.DataFrame({"key": ["a"]})
+    cache.apply(df, ["key"], counting(calls))
+
+    cache.clear()
+
+    assert len(cache) == 0
+    cache.apply(df, ["key"], counting(calls))
+    assert calls == ["a", "a"]
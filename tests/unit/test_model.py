@@ -0,0 +1,138 @@
+import datetime
+import random
+
+import pytest
+
+import model
+
+
+@pytest.mark.parametrize("value", ["2024-01-02", "2024-1-2", "2024-12-31"])
+def test_dates_parse_like_strptime(value):
+    transaction = model.Transaction(booking_date=value)
+
+    expected = datetime.datetime.strptime(value, model.DATE_FORMAT).date()
+    assert transaction.booking_date == expected
+
+
+@pytest.mark.parametrize("value", ["20240102", "2024-W01-2", "2024-02-30", "2024"])
+def test_malformed_dates_raise_on_read(value):
+    transaction = model.Transaction(booking_date=value)
+
+    with pytest.raises(ValueError):
+        transaction.booking_date
+
+
+def make_user_data(transactions) -> model.UserData:
+    requisition = model.Requisition(
+        **{
+            field: "" for field in model.Requisition.model_fields if field != "accounts"
+        },
+        accounts=["a", "b", "c"],
+    )
+    return model.UserData(requisition=requisition, transactions=transactions)
+
+
+def make_transactions(rows: int = 500, seed: int = 0) -> list[model.Transaction]:
+    rng = random.Random(seed)
+    dates = [None, "2024-02-29", "2024-03-01"] + [
+        f"2024-{month:02d}-{day:02d}" for month in (1, 2, 3) for day in (1, 15, 28)
+    ]
+    return [
+        model.Transaction(
+            transaction_id=str(i),
+            account_id=rng.choice(["a", "b", "c"]),
+            proprietary_bank_transaction_code=rng.choice([None, "DD", "SO", "CARD"]),
+            booking_date=rng.choice(dates),
+            amount=float(i),
+        )
+        for i in range(rows)
+    ]
+
+
+def ids(transactions) -> list[str]:
+    return [transaction.transaction_id for transaction in transactions]
+
+
+@pytest.fixture(params=["list", "table"])
+def user_data(request) -> model.UserData:
+    transactions = make_transactions()
+    if request.param == "table":
+        transactions = model.TransactionTable.from_transactions(transactions)
+    return make_user_data(transactions)
+
+
+@pytest.mark.parametrize("account_id", ["a", "c", "missing"])
+def test_account_lookup_matches_a_scan(user_data, account_id):
+    expected = [t for t in make_transactions() if t.account_id == account_id]
+
+    assert ids(user_data.get_account_transactions(account_id)) == ids(expected)
+
+
+@pytest.mark.parametrize("code", ["DD", "CARD", None, "missing"])
+def test_code_lookup_matches_a_scan(user_data, code):
+    expected = [
+        t for t in make_transactions() if t.proprietary_bank_transaction_code == code
+    ]
+
+    assert ids(user_data.query_transactions_by_transaction_code(code)) == ids(expected)
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (None, None),
+        (datetime.date(2024, 1, 15), datetime.date(2024, 2, 29)),
+        (datetime.date(2024, 2, 16), None),
+        (None, datetime.date(2024, 1, 14)),
+        (datetime.date(2024, 3, 2), datetime.date(2024, 3, 1)),
+    ],
+)
+def test_booking_date_lookup_matches_a_scan(user_data, start, end):
+    expected = sorted(
+        (
+            t
+            for t in make_transactions()
+            if t.booking_date is not None
+            and (start is None or start <= t.booking_date)
+            and (end is None or t.booking_date <= end)
+        ),
+        key=lambda t: (t.booking_date, int(t.transaction_id)),
+    )
+
+    assert ids(user_data.query_transactions_by_booking_date(start, end)) == ids(
+        expected
+    )
+
+
+def test_indexes_follow_reassigned_and_appended_transactions():
+    user_data = make_user_data(make_transactions(10))
+    before = len(user_data.get_account_transactions("a"))
+
+    user_data.transactions.append(model.Transaction(transaction_id="new", account_id="a"))
+    assert len(user_data.get_account_transactions("a")) == before + 1
+
+    user_data.transactions = []
+    assert len(user_data.get_account_transactions("a")) == 0
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [("account_id", "b"), ("proprietary_bank_transaction_code", None), ("amount", 7)],
+)
+def test_table_mask_matches_a_scan(field, value):
+    transactions = make_transactions()
+    table = model.TransactionTable.from_transactions(transactions)
+
+    expected = [t for t in transactions if getattr(t, field) == value]
+
+    assert ids(table[table.mask(field, value)]) == ids(expected)
+
+
+def test_table_rows_read_as_their_transactions():
+    transactions = make_transactions(50)
+    table = model.TransactionTable.from_transactions(transactions)
+
+    assert list(table) == transactions
+    assert table[-1] == transactions[-1]
+    assert ids(table[10:20]) == ids(transactions[10:20])
+    assert table.to_transactions() == transactions
@@ -0,0 +1,70 @@
+import model
+import process_transactions
+from enrich.rules import RuleFileCategorizer
+
+
+def card_payment(**fields) -> model.Transaction:
+    return model.Transaction(
+        **{
+            "account_id": "account",
+            "account_type": "CARD",
+            "booking_date": "2024-01-01",
+            "amount": -3.5,
+            "remittance_information_unstructured": "card payment",
+            "proprietary_bank_transaction_code": "DEB",
+            "merchant_category_code": "5812",
+            "debtor_name": "me",
+            "creditor_name": "costa coffee",
+            **fields,
+        }
+    )
+
+
+def test_enrich_incremental_keeps_transactions_with_the_same_fingerprint(tmp_path):
+    store_path = tmp_path / "store.json"
+    transactions = [
+        card_payment(creditor_name="costa coffee"),
+        card_payment(creditor_name="starbucks"),
+    ]
+
+    for _ in range(2):
+        enriched = process_transactions.enrich_incremental(transactions, store_path)
+        assert [t.counterparty for t in enriched] == ["costa coffee", "starbucks"]
+
+
+def test_enrich_incremental_matches_enrich(tmp_path):
+    store_path = tmp_path / "store.json"
+    old = [
+        card_payment(booking_date="2024-01-02", creditor_name="starbucks"),
+        card_payment(booking_date="2024-01-03", creditor_name="tesco"),
+    ]
+    new = [
+        card_payment(booking_date="2024-01-04", value_date="2024-01-04"),
+        card_payment(booking_date="2024-01-05", value_date="2024-01-05"),
+    ]
+    process_transactions.enrich_incremental(old, store_path)
+
+    enriched = process_transactions.enrich_incremental(old + new, store_path)
+
+    expected = process_transactions.enrich(old + new)
+    assert [t.to_dict() for t in enriched] == [t.to_dict() for t in expected]
+    assert all(t.value_date is None for t in enriched)
+
+
+def test_enrich_incremental_re_enriches_when_the_rules_change(tmp_path):
+    store_path, rules_path = tmp_path / "store.json", tmp_path / "rules.yaml"
+    rule = "rules:\n  - category: {}\n    column: counterparty\n    contains: costa\n"
+    rules_path.write_text(rule.format("coffee"))
+    categorizer = RuleFileCategorizer(rules_path, cache_dir=None)
+    transactions = [card_payment()]
+
+    enriched = process_transactions.enrich_incremental(
+        transactions, store_path, categorizer
+    )
+    assert enriched[0].category == "coffee"
+
+    rules_path.write_text(rule.format("eating out"))
+    enriched = process_transactions.enrich_incremental(
+        transactions, store_path, categorizer
+    )
+    assert enriched[0].category == "eating out"
@@ -0,0 +1,52 @@
+import yaml
+
+from benchmarks import make_transactions
+from enrich import categories
+from enrich.mappings import DESCRIPTION
+from enrich.rules import RULES_PATH, RuleFileCategorizer
+
+
+def test_keywords_added_to_the_rule_file_are_picked_up(tmp_path):
+    rules_path = tmp_path / "rules.yaml"
+    rules_path.write_text(RULES_PATH.read_text())
+    categorizer = RuleFileCategorizer(rules_path, cache_dir=None)
+    df = make_transactions(1, distinct=1)
+    df[DESCRIPTION] = ["card payment at zzyzx traders"]
+    assert categorizer.categorize_transactions(df.copy())["category"][0] == "unlabelled"
+
+    rule_file = yaml.safe_load(rules_path.read_text())
+    rule_file["keywords"]["shopping"].append("zzyzx traders")
+    rules_path.write_text(yaml.safe_dump(rule_file))
+
+    assert categorizer.reload()
+    assert categorizer.categorize_transactions(df.copy())["category"][0] == "shopping"
+
+
+def test_rule_file_categorizes_like_categories():
+    categorizer = RuleFileCategorizer(cache_dir=None)
+    df = make_transactions(5000, distinct=2000)
+
+    expected = categories.categorizer.categorize_transactions(df.copy())
+    labelled = categorizer.categorize_transactions(df.copy())
+
+    assert [category for category, _ in categorizer.category_rules] == [
+        category for category, _ in categories.categorizer.category_rules
+    ]
+    assert labelled["category"].tolist() == expected["category"].tolist()
+
+
+def test_memoized_categories_depend_on_every_column_a_rule_reads(tmp_path):
+    rules_path = tmp_path / "rules.yaml"
+    rules_path.write_text(
+        "rules:\n"
+        "  - category: card\n"
+        "    column: account_type\n"
+        "    equals: CARD\n"
+    )
+    categorizer = RuleFileCategorizer(rules_path, cache_dir=None)
+    df = make_transactions(2, distinct=1)
+    df["account_type"] = ["CACC", "CARD"]
+
+    for _ in range(2):
+        labelled = categorizer.categorize_transactions(df.copy(), memoize=True)
+        assert labelled["category"].tolist() == ["unlabelled", "card"]
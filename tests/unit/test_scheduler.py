@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.nordigen.scheduler import (
+    RateLimitExceeded,
+    RequestBudgets,
+    RequestScheduler,
+    TokenBucket,
+)
+
+
+def response(status: int, **headers) -> SimpleNamespace:
+    return SimpleNamespace(status=status, headers=headers)
+
+
+async def serve(
+    scheduler: RequestScheduler, statuses: list[int], answered: list, **headers
+):
+    """Request a stub answering with statuses in turn, then 200s."""
+
+    async def handler(request):
+        status = statuses[len(answered)] if len(answered) < len(statuses) else 200
+        answered.append(status)
+        return web.json_response({"status": status}, status=status, headers=headers)
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    async with TestServer(app) as server, aiohttp.ClientSession() as session:
+        return await scheduler.request(session, str(server.make_url("/")), {}, "a", "e")
+
+
+def test_used_up_window_refills_by_the_reset():
+    bucket = TokenBucket()
+    bucket.sync(limit=0, remaining=0, reset=10)
+
+    assert 0 < bucket.delay() <= 10
+
+
+def test_acquire_gives_up_on_long_waits():
+    bucket = TokenBucket()
+    bucket.sync(limit=4, remaining=0, reset=86400)
+
+    assert not asyncio.run(bucket.acquire(max_delay=60))
+    assert bucket.tokens < 1
+
+
+def test_acquire_takes_a_token():
+    bucket = TokenBucket(capacity=2, rate=1)
+
+    assert asyncio.run(bucket.acquire(max_delay=0))
+    assert bucket.tokens == pytest.approx(1, abs=0.01)
+
+
+def test_request_paced_beyond_backoff_max_is_not_sent():
+    scheduler = RequestScheduler(backoff_max=60)
+    scheduler._buckets["account", "transactions"].sync(4, 0, 86400)
+
+    with pytest.raises(RateLimitExceeded):
+        # no session, the request must fail before being sent
+        asyncio.run(scheduler.request(None, "url", {}, "account", "transactions"))
+    assert not scheduler._semaphore.locked()
+    assert not scheduler._account_semaphores["account"].locked()
+
+
+def test_429_waits_for_the_reset():
+    scheduler = RequestScheduler(backoff_base=0.1, backoff_max=60)
+    used_up = {
+        "HTTP_X_RATELIMIT_LIMIT": "4",
+        "HTTP_X_RATELIMIT_REMAINING": "0",
+        "HTTP_X_RATELIMIT_RESET": "30",
+    }
+
+    assert scheduler._retry_delay(0, response(429, **used_up), "a", "e") == 30
+    assert (
+        scheduler._retry_delay(0, response(429, **{"Retry-After": "20"}), "a", "e")
+        == 20
+    )
+    assert scheduler._retry_delay(0, response(429), "a", "e") <= 0.1
+
+
+def test_429_resetting_beyond_backoff_max_is_not_retried():
+    scheduler = RequestScheduler(backoff_max=60)
+    quota_used_up = {
+        "HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_LIMIT": "4",
+        "HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_REMAINING": "0",
+        "HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_RESET": "86400",
+    }
+
+    with pytest.raises(RateLimitExceeded):
+        scheduler._retry_delay(0, response(429, **quota_used_up), "a", "e")
+
+
+def test_retries_end_after_max_retries():
+    scheduler = RequestScheduler(max_retries=2)
+
+    assert scheduler._retry_delay(1, response(503), "a", "e") is not None
+    assert scheduler._retry_delay(2, response(503), "a", "e") is None
+
+
+def test_server_errors_are_retried():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0)
+    answered = []
+
+    assert asyncio.run(serve(scheduler, [503, 500], answered)) == {"status": 200}
+    assert answered == [503, 500, 200]
+
+
+def test_server_errors_raise_after_max_retries():
+    scheduler = RequestScheduler(max_retries=2, backoff_base=0)
+    answered = []
+
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        asyncio.run(serve(scheduler, [503] * 4, answered))
+
+    assert error.value.status == 503
+    assert answered == [503] * 3
+
+
+def test_quota_is_recorded_from_responses():
+    scheduler = RequestScheduler()
+    asyncio.run(
+        serve(
+            scheduler,
+            [],
+            [],
+            HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_LIMIT="4",
+            HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_REMAINING="3",
+            HTTP_X_RATELIMIT_ACCOUNT_SUCCESS_RESET="3600",
+        )
+    )
+
+    assert scheduler.budgets.remaining("a", "e") == 3
+
+
+def test_budgets_check_the_quota_left(tmp_path):
+    budgets = RequestBudgets(tmp_path / "budgets.json")
+    budgets.record("a", "transactions", 4, 1, 3600)
+
+    budgets.check([("a", "transactions"), ("b", "transactions")])
+    with pytest.raises(RateLimitExceeded, match="a transactions"):
+        budgets.check([("a", "transactions")] * 2)
+
+
+def test_budgets_persist_until_the_reset(tmp_path):
+    path = tmp_path / "budgets.json"
+    budgets = RequestBudgets(path)
+    budgets.record("a", "transactions", 4, 1, 3600)
+    budgets.record("a", "balances", 4, 0, 0)
+
+    reloaded = RequestBudgets(path)
+    assert reloaded.remaining("a", "transactions") == 1
+    assert reloaded.remaining("a", "balances") is None
+    assert reloaded.remaining("b", "transactions") is None
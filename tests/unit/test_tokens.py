@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+from requests import HTTPError, Response
+
+from services.nordigen import tokens
+
+DAY = 24 * 60 * 60
+
+
+class StubClient:
+    """NordigenClient recording its token requests."""
+
+    def __init__(self, secret_id: str, secret_key: str):
+        self.token = None
+        self.calls = []
+        self.refresh_status = None
+
+    def generate_token(self) -> dict:
+        self.calls.append("new")
+        time.sleep(0.01)
+        return {
+            "access": f"access-{len(self.calls)}",
+            "access_expires": DAY,
+            "refresh": f"refresh-{len(self.calls)}",
+            "refresh_expires": 30 * DAY,
+        }
+
+    def exchange_token(self, refresh_token: str) -> dict:
+        self.calls.append(f"refresh {refresh_token}")
+        if self.refresh_status:
+            response = Response()
+            response.status_code = self.refresh_status
+            raise HTTPError(response=response)
+        return {"access": f"access-{len(self.calls)}", "access_expires": DAY}
+
+
+@pytest.fixture(autouse=True)
+def stub_client(monkeypatch):
+    monkeypatch.setattr(tokens, "NordigenClient", StubClient)
+
+
+def expire_access(manager: tokens.TokenManager):
+    manager._tokens["access_expires_at"] = time.time()
+    manager._save()
+
+
+def test_saved_tokens_are_reused(tmp_path):
+    token_path = tmp_path / "token.json"
+    tokens.TokenManager("id", "key", token_path).get_token()
+
+    manager = tokens.TokenManager("id", "key", token_path)
+    assert manager.get_token() == "access-1"
+    assert manager.client.calls == []
+
+
+def test_expired_access_token_is_refreshed(tmp_path):
+    manager = tokens.TokenManager("id", "key", tmp_path / "token.json")
+    manager.get_token()
+    expire_access(manager)
+
+    assert manager.get_token() == "access-2"
+    assert manager.client.calls == ["new", "refresh refresh-1"]
+
+
+def test_concurrent_requests_renew_once(tmp_path):
+    manager = tokens.TokenManager("id", "key", tmp_path / "token.json")
+
+    async def main():
+        return await asyncio.gather(*(manager.get_token_async() for _ in range(20)))
+
+    assert set(asyncio.run(main())) == {"access-1"}
+    assert manager.client.calls == ["new"]
+
+
+def test_tokens_of_another_secret_id_are_ignored(tmp_path):
+    token_path = tmp_path / "token.json"
+    tokens.TokenManager("other", "key", token_path).get_token()
+
+    manager = tokens.TokenManager("id", "key", token_path)
+    assert manager.get_token() == "access-1"
+    assert manager.client.calls == ["new"]
+
+
+def test_rejected_refresh_token_is_replaced(tmp_path):
+    token_path = tmp_path / "token.json"
+    manager = tokens.TokenManager("id", "key", token_path)
+    manager.get_token()
+    expire_access(manager)
+    manager.client.refresh_status = 401
+
+    assert manager.get_token() == "access-3"
+    assert manager.client.calls == ["new", "refresh refresh-1", "new"]
+    reloaded = tokens.TokenManager("id", "key", token_path)
+    assert reloaded._tokens["refresh"] == "refresh-3"
+
+
+def test_refresh_server_errors_are_raised(tmp_path):
+    manager = tokens.TokenManager("id", "key", tmp_path / "token.json")
+    manager.get_token()
+    expire_access(manager)
+    manager.client.refresh_status = 503
+
+    with pytest.raises(HTTPError):
+        manager.get_token()
+    assert manager._tokens["refresh"] == "refresh-1"
@@ -0,0 +1,30 @@
+import json
+import stat
+
+import pytest
+
+import utils
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "data" / "file.json"
+
+    with utils.atomic_write(path, permissions=0o644) as file:
+        json.dump({"a": 1}, file)
+
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_atomic_write_failure_keeps_the_file(tmp_path):
+    path = tmp_path / "data" / "file.json"
+    path.parent.mkdir()
+    path.write_text("before")
+
+    with pytest.raises(TypeError):
+        with utils.atomic_write(path) as file:
+            json.dump({"a": object()}, file)
+
+    assert path.read_text() == "before"
+    assert list(path.parent.iterdir()) == [path]